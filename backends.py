@@ -0,0 +1,287 @@
+import os
+import sys
+import json
+import time
+import importlib.util
+import numpy as np
+
+# Model files; the ONNX model is exported from the same network (tf2onnx keeps NHWC inputs)
+TFLITE_MODEL_PATH = "assets/model.tflite"
+ONNX_MODEL_PATH = "assets/model.onnx"
+
+# Backend to use: one of BACKENDS, or "auto" for the benchmarked choice if one was saved
+# (run `python backends.py`), otherwise the first available in BACKEND_PREFERENCE
+BACKEND = os.environ.get("MEDPLANT_BACKEND", "auto")
+
+# Order "auto" picks from without a benchmark: the light runtimes first. Full TensorFlow
+# runs the same TFLite kernels as tflite_runtime at a far larger import and memory cost.
+BACKEND_PREFERENCE = ('tflite_runtime', 'onnxruntime', 'opencv', 'tensorflow')
+
+# Where the result of `python backends.py` is remembered between launches
+BACKEND_CHOICE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "medplant", "backend.json")
+
+# Input size used when a backend cannot report it
+DEFAULT_INPUT_SIZE = (256, 256)
+
+
+# Inference through the TFLite interpreter from the small tflite_runtime wheel.
+# Every backend exposes the same interface:
+#   input_height, input_width, batch_size, model_path
+#   input_dtype, input_quantization (scale, zero_point; scale 0.0 means not quantized)
+#   resize_batch(batch_size)
+#   input_view()  -> writable (batch, height, width, 3) array of input_dtype to fill before run()
+#   run()         -> (batch, num_classes) float32 output array, dequantized if needed
+class TFLiteBackend:
+    name = 'tflite_runtime'
+    module = 'tflite_runtime'
+    default_model_path = TFLITE_MODEL_PATH
+
+    @classmethod
+    def is_available(cls):
+        return importlib.util.find_spec(cls.module) is not None
+
+    def _interpreter_class(self):
+        from tflite_runtime.interpreter import Interpreter
+        return Interpreter
+
+    def __init__(self, model_path=None, num_threads=1):
+        self.model_path = model_path or self.default_model_path
+        self.interpreter = self._interpreter_class()(model_path=self.model_path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        self.input_details = self.interpreter.get_input_details()
+        self.output_details = self.interpreter.get_output_details()
+
+        # Model input size (height, width)
+        self.input_height, self.input_width = (int(d) for d in self.input_details[0]['shape'][1:3])
+        self.batch_size = int(self.input_details[0]['shape'][0])
+
+        # Quantized (uint8/int8) and float16 models take and return other dtypes than float32
+        self.input_dtype = np.dtype(self.input_details[0]['dtype'])
+        self.input_quantization = self.input_details[0]['quantization']
+        self.output_dtype = np.dtype(self.output_details[0]['dtype'])
+        self.output_quantization = self.output_details[0]['quantization']
+
+    # Re-allocating tensors is expensive, so it is only done when the size changes
+    def resize_batch(self, batch_size):
+        if self.batch_size == batch_size:
+            return
+        self.interpreter.resize_tensor_input(self.input_details[0]['index'],
+                                             [batch_size, self.input_height, self.input_width, 3])
+        self.interpreter.allocate_tensors()
+        self.batch_size = batch_size
+
+    # View straight into the interpreter's input buffer. Callers must drop it before run():
+    # TFLite refuses to invoke() while a numpy view into its buffers is still referenced.
+    def input_view(self):
+        return self.interpreter.tensor(self.input_details[0]['index'])()
+
+    def run(self):
+        self.interpreter.invoke()
+        output_data = self.interpreter.get_tensor(self.output_details[0]['index'])
+
+        scale, zero_point = self.output_quantization
+        if scale:
+            return (output_data.astype(np.float32) - zero_point) * scale
+        return output_data.astype(np.float32, copy=False)
+
+
+# The same TFLite interpreter, reached through the full TensorFlow package
+class TensorFlowBackend(TFLiteBackend):
+    name = 'tensorflow'
+    module = 'tensorflow'
+
+    def _interpreter_class(self):
+        import tensorflow as tf
+        return tf.lite.Interpreter
+
+
+# Inference through ONNX Runtime on the exported ONNX model
+class ONNXRuntimeBackend:
+    name = 'onnxruntime'
+    module = 'onnxruntime'
+    default_model_path = ONNX_MODEL_PATH
+
+    @classmethod
+    def is_available(cls):
+        return importlib.util.find_spec(cls.module) is not None
+
+    def __init__(self, model_path=None, num_threads=1):
+        import onnxruntime as ort
+
+        self.model_path = model_path or self.default_model_path
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(self.model_path, options, providers=['CPUExecutionProvider'])
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        height, width = model_input.shape[1:3]
+        if not isinstance(height, int) or not isinstance(width, int):
+            height, width = DEFAULT_INPUT_SIZE
+        self.input_height, self.input_width = height, width
+        self.input_dtype = np.dtype(np.float32)
+        self.input_quantization = (0.0, 0)
+        self.batch_size = 1
+        self._input = np.zeros((1, height, width, 3), dtype=np.float32)
+
+    def resize_batch(self, batch_size):
+        if self.batch_size == batch_size:
+            return
+        self._input = np.zeros((batch_size, self.input_height, self.input_width, 3), dtype=np.float32)
+        self.batch_size = batch_size
+
+    def input_view(self):
+        return self._input
+
+    def run(self):
+        return self.session.run(None, {self.input_name: self._input})[0]
+
+
+# Inference through OpenCV's DNN module, which reads .tflite (OpenCV 4.8+) and .onnx models
+class OpenCVBackend:
+    name = 'opencv'
+    module = 'cv2'
+    default_model_path = TFLITE_MODEL_PATH
+
+    @classmethod
+    def is_available(cls):
+        if importlib.util.find_spec(cls.module) is None:
+            return False
+        import cv2
+        return hasattr(cv2.dnn, 'readNetFromTFLite')
+
+    def __init__(self, model_path=None, num_threads=1):
+        import cv2
+
+        self.model_path = model_path or self.default_model_path
+        cv2.setNumThreads(num_threads)  # Process wide in OpenCV
+        if self.model_path.endswith('.tflite'):
+            self.net = cv2.dnn.readNetFromTFLite(self.model_path)
+        else:
+            self.net = cv2.dnn.readNet(self.model_path)
+
+        # OpenCV cannot report the input shape before the first forward pass
+        self.input_height, self.input_width = DEFAULT_INPUT_SIZE
+        self.input_dtype = np.dtype(np.float32)
+        self.input_quantization = (0.0, 0)
+        self.batch_size = 1
+        self._input = np.zeros((1, self.input_height, self.input_width, 3), dtype=np.float32)
+
+    def resize_batch(self, batch_size):
+        if self.batch_size == batch_size:
+            return
+        self._input = np.zeros((batch_size, self.input_height, self.input_width, 3), dtype=np.float32)
+        self.batch_size = batch_size
+
+    def input_view(self):
+        return self._input
+
+    def run(self):
+        # OpenCV DNN takes NCHW blobs
+        self.net.setInput(np.ascontiguousarray(self._input.transpose(0, 3, 1, 2)))
+        return self.net.forward()
+
+
+BACKENDS = {backend.name: backend for backend in
+            (TFLiteBackend, TensorFlowBackend, ONNXRuntimeBackend, OpenCVBackend)}
+
+
+# Function to list the backends whose runtime is installed on this host
+def available_backends():
+    return [name for name, backend in BACKENDS.items() if backend.is_available()]
+
+
+# Function to create a backend by name
+def create_backend(name, model_path=None, num_threads=1):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {name}")
+    return BACKENDS[name](model_path, num_threads)
+
+
+# Function to time one inference on each available backend.
+# Returns {backend name: median seconds per invoke}; backends that fail to load are skipped.
+def benchmark_backends(names=None, runs=10, num_threads=1):
+    timings = {}
+    for name in names or available_backends():
+        try:
+            backend = create_backend(name, num_threads=num_threads)
+            backend.resize_batch(1)
+            backend.run()  # Warm up
+
+            durations = []
+            for _ in range(runs):
+                started = time.perf_counter()
+                backend.run()
+                durations.append(time.perf_counter() - started)
+            timings[name] = float(np.median(durations))
+        except Exception as e:
+            print(f"Skipping inference backend {name}: {e}")
+    return timings
+
+
+def _load_backend_choice(candidates):
+    try:
+        with open(BACKEND_CHOICE_PATH) as f:
+            choice = json.load(f)
+    except (OSError, ValueError):
+        return None
+    # Re-run the benchmark when runtimes are installed or removed
+    if choice.get('candidates') != candidates or choice.get('backend') not in candidates:
+        return None
+    return choice['backend']
+
+
+def _save_backend_choice(backend, candidates, timings):
+    try:
+        os.makedirs(os.path.dirname(BACKEND_CHOICE_PATH), exist_ok=True)
+        with open(BACKEND_CHOICE_PATH, 'w') as f:
+            json.dump({'backend': backend, 'candidates': candidates, 'timings': timings}, f)
+    except OSError as e:
+        print(f"Error saving inference backend choice: {e}")
+
+
+# Function to resolve the configured backend name without loading any backend. "auto" takes
+# the fastest from a saved `python backends.py` run, otherwise the first available backend in
+# BACKEND_PREFERENCE whose model file is present.
+def select_backend(name=BACKEND):
+    if name != 'auto':
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown inference backend: {name}")
+        return name
+
+    candidates = available_backends()
+    chosen = _load_backend_choice(candidates)
+    if chosen:
+        return chosen
+
+    preferred = [candidate for candidate in BACKEND_PREFERENCE if candidate in candidates]
+    if not preferred:
+        raise RuntimeError("No inference backend is available")
+    for candidate in preferred:
+        if os.path.exists(BACKENDS[candidate].default_model_path):
+            return candidate
+    return preferred[0]
+
+
+# Function to get the model file the configured backend loads by default, without loading
+# it. None when no backend is available.
+def backend_model_path(name=BACKEND):
+    try:
+        return BACKENDS[select_backend(name)].default_model_path
+    except RuntimeError:
+        return None
+
+
+# Benchmark the available backends from the command line and remember the fastest for "auto".
+# Full TensorFlow is skipped when tflite_runtime is there, as it runs the same kernels.
+if __name__ == "__main__":
+    candidates = available_backends()
+    names = [name for name in candidates if not (name == 'tensorflow' and 'tflite_runtime' in candidates)]
+    timings = benchmark_backends(names)
+    if not timings:
+        print("No inference backend is available")
+        sys.exit(1)
+
+    for name, seconds in sorted(timings.items(), key=lambda item: item[1]):
+        print(f"{name:>16}: {seconds * 1000:.1f} ms")
+    _save_backend_choice(min(timings, key=timings.get), candidates, timings)
@@ -0,0 +1,61 @@
+import os
+import time
+import argparse
+import numpy as np
+from inference import InterpreterPool
+from backends import BACKEND
+
+
+# Function to load benchmark inputs: every image in `images_dir`, or random
+# 640x480 BGR frames (like the camera produces) when no directory is given
+def load_inputs(images_dir=None, count=32):
+    if images_dir:
+        files = sorted(f for f in os.listdir(images_dir)
+                       if f.lower().endswith(('.png', '.jpg', '.jpeg', '.webp')))
+        return [os.path.join(images_dir, f) for f in files]
+
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, size=(480, 640, 3), dtype=np.uint8) for _ in range(count)]
+
+
+# Function to measure images/sec for one pool configuration
+def benchmark_pool(inputs, pool_size, num_threads, batch_size, repeats, model_path=None, backend=BACKEND):
+    pool = InterpreterPool(model_path, size=pool_size, num_threads=num_threads, backend=backend)
+    pool.classify_batch(inputs[:batch_size], batch_size)  # Warm up
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        pool.classify_batch(inputs, batch_size)
+    elapsed = time.perf_counter() - started
+
+    return len(inputs) * repeats / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure classification throughput of the interpreter pool")
+    parser.add_argument("--images", help="Directory of images to classify (default: synthetic frames)")
+    parser.add_argument("--count", type=int, default=32, help="Number of synthetic frames")
+    parser.add_argument("--model", help="Path to the model (default: the backend's model)")
+    parser.add_argument("--backend", default=BACKEND, help="Inference backend name or 'auto'")
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    inputs = load_inputs(args.images, args.count)
+    if not inputs:
+        print("No images to benchmark.")
+        return
+
+    print(f"{len(inputs)} images, batch size {args.batch_size}, {args.repeats} repeats")
+    print(f"{'pool':>6} {'threads':>8} {'images/sec':>12}")
+    for pool_size in args.pool_sizes:
+        for num_threads in args.threads:
+            throughput = benchmark_pool(inputs, pool_size, num_threads, args.batch_size, args.repeats,
+                                        args.model, args.backend)
+            print(f"{pool_size:>6} {num_threads:>8} {throughput:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import os
+import time
+import argparse
+import tempfile
+from fake_firestore import FakeFirestore, seed_plants
+from plant_markers import load_markers, sync_markers, FETCH_WORKERS
+from marker_cache import MarkerCache
+
+
+# Function to connect to a local Firestore emulator (FIRESTORE_EMULATOR_HOST must be set)
+def emulator_client(project):
+    if not os.environ.get('FIRESTORE_EMULATOR_HOST'):
+        raise SystemExit("Set FIRESTORE_EMULATOR_HOST (e.g. localhost:8080) to use the emulator")
+    from google.cloud import firestore
+    return firestore.Client(project=project)
+
+
+# Function to write the same synthetic catalogue as seed_plants into the emulator
+def seed_emulator(db, plants, points):
+    from google.cloud import firestore
+    batch = db.batch()
+    pending = 0
+    for index in range(plants):
+        plant_ref = db.collection('plant_details').document(f"plant_{index:05d}")
+        batch.set(plant_ref, {'Common Name': f"Plant {index}", 'updated_at': firestore.SERVER_TIMESTAMP})
+        for point in range(points):
+            location = firestore.GeoPoint(10.0 + index * 0.001, 76.0 + point * 0.001)
+            batch.set(plant_ref.collection('coordinates').document(f"location_{point}"),
+                      {'location': location, 'updated_at': firestore.SERVER_TIMESTAMP})
+        pending += 1 + points
+        if pending >= 400:  # Firestore allows 500 writes per batch
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+    batch.commit()
+
+
+# Function to time one marker loader; returns (seconds, markers, round trips or None)
+def time_loader(db, **kwargs):
+    round_trips = getattr(db, 'round_trips', None)
+    started = time.perf_counter()
+    markers = load_markers(db, **kwargs)
+    elapsed = time.perf_counter() - started
+    if round_trips is not None:
+        round_trips = db.round_trips - round_trips
+    return elapsed, markers, round_trips
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time-to-markers for the map's Firestore loaders")
+    parser.add_argument("--plants", type=int, default=200, help="Plants in the synthetic catalogue")
+    parser.add_argument("--points", type=int, default=2, help="Coordinates per plant")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake round-trip time in seconds")
+    parser.add_argument("--workers", type=int, default=FETCH_WORKERS, help="Parallel per-plant reads")
+    parser.add_argument("--emulator", action="store_true", help="Use the Firestore emulator instead of the fake")
+    parser.add_argument("--project", default="demo-medplant", help="Emulator project id")
+    parser.add_argument("--seed", action="store_true", help="Write the synthetic catalogue into the emulator first")
+    args = parser.parse_args()
+
+    if args.emulator:
+        db = emulator_client(args.project)
+        if args.seed:
+            seed_emulator(db, args.plants, args.points)
+        print(f"Firestore emulator at {os.environ['FIRESTORE_EMULATOR_HOST']}")
+    else:
+        db = FakeFirestore(latency=args.latency)
+        seed_plants(db, args.plants, args.points)
+        print(f"Fake Firestore, {args.plants} plants x {args.points} coordinates, "
+              f"{args.latency * 1000:.0f} ms per round trip")
+
+    loaders = [
+        ("per plant, serial", dict(use_collection_group=False, workers=1)),
+        (f"per plant, {args.workers} workers", dict(use_collection_group=False, workers=args.workers)),
+        ("collection group", dict(use_collection_group=True)),
+    ]
+
+    print(f"{'loader':>24} {'seconds':>8} {'markers':>8} {'round trips':>12}")
+    for name, kwargs in loaders:
+        elapsed, markers, round_trips = time_loader(db, **kwargs)
+        trips = "-" if round_trips is None else str(round_trips)
+        print(f"{name:>24} {elapsed:>8.2f} {len(markers):>8} {trips:>12}")
+
+    # What the app does: first sync, then a launch that draws from disk and fetches only changes
+    with tempfile.TemporaryDirectory() as cache_dir:
+        marker_cache = MarkerCache(os.path.join(cache_dir, "markers.sqlite3"))
+        for name, load in [("first sync", lambda: sync_markers(db, marker_cache)),
+                           ("markers from disk", marker_cache.markers),
+                           ("delta sync", lambda: sync_markers(db, marker_cache))]:
+            round_trips = getattr(db, 'round_trips', None)
+            started = time.perf_counter()
+            markers = load()
+            elapsed = time.perf_counter() - started
+            trips = "-" if round_trips is None else str(db.round_trips - round_trips)
+            print(f"{name:>24} {elapsed:>8.2f} {len(markers):>8} {trips:>12}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import os
+import json
+import time
+import argparse
+import platform
+import tempfile
+from datetime import datetime
+import numpy as np
+import cv2
+from PIL import Image
+from benchmark import load_inputs
+from backends import BACKEND
+from inference import InterpreterPool, format_result
+from capture_writer import CAPTURE_FORMAT, CAPTURE_EXTENSIONS, encode_params
+
+# Stages of the capture -> classify -> show path, in order
+STAGES = ['capture', 'write', 'decode', 'resize', 'normalize', 'invoke', 'postprocess', 'render']
+
+# Earlier names of stages, so older results files still compare
+STAGE_ALIASES = {'write': 'png_write'}
+
+
+# Function to summarize a list of durations (seconds) as milliseconds
+def summarize(durations):
+    durations_ms = np.asarray(durations) * 1000.0
+    return {
+        'p50_ms': float(np.percentile(durations_ms, 50)),
+        'p95_ms': float(np.percentile(durations_ms, 95)),
+        'p99_ms': float(np.percentile(durations_ms, 99)),
+        'mean_ms': float(durations_ms.mean()),
+    }
+
+
+# Function to time each stage of the pipeline for every input.
+# Inputs are synthetic/recorded frames, or frames read from `camera` when it is given.
+# Rendering stops short of ImageTk.PhotoImage so no display is needed.
+def time_stages(pool, inputs, repeats, work_dir, camera=None, image_format=CAPTURE_FORMAT):
+    params = encode_params(image_format)
+    timings = {stage: [] for stage in STAGES}
+
+    with pool.acquire() as runner:
+        runner.resize_batch(1)
+        size = (runner.input_width, runner.input_height)
+
+        for _ in range(repeats):
+            for index, source in enumerate(inputs):
+                started = time.perf_counter()
+                if camera is not None:
+                    ret, frame = camera.read()
+                    if not ret:
+                        raise RuntimeError("Failed to read a frame from the camera")
+                elif isinstance(source, np.ndarray):
+                    frame = source.copy()
+                else:
+                    frame = cv2.imread(source, cv2.IMREAD_COLOR)
+                timings['capture'].append(time.perf_counter() - started)
+
+                image_path = os.path.join(work_dir, f'captured_frame_{index}{CAPTURE_EXTENSIONS[image_format]}')
+                started = time.perf_counter()
+                cv2.imwrite(image_path, frame, params)
+                timings['write'].append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                pixels = cv2.imread(image_path, cv2.IMREAD_COLOR)
+                timings['decode'].append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                cv2.resize(pixels, size, dst=runner.scratch, interpolation=cv2.INTER_AREA)
+                timings['resize'].append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                input_view = runner.backend.input_view()
+                runner.convert(runner.scratch[..., ::-1], input_view[0])
+                del input_view
+                timings['normalize'].append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                output_data = runner.backend.run()
+                timings['invoke'].append(time.perf_counter() - started)
+
+                started = time.perf_counter()
+                format_result(output_data[0], 3)
+                timings['postprocess'].append(time.perf_counter() - started)
+
+                # What the result popup does before handing the image to Tk
+                started = time.perf_counter()
+                Image.open(image_path).resize((256, 256))
+                timings['render'].append(time.perf_counter() - started)
+
+    return {stage: summarize(durations) for stage, durations in timings.items()}
+
+
+# Function to time the whole preprocess + classify path per image, as classify_image runs it
+def time_end_to_end(pool, inputs, repeats, work_dir):
+    paths = []
+    for index, source in enumerate(inputs):
+        if isinstance(source, np.ndarray):
+            path = os.path.join(work_dir, f'input_{index}.png')
+            cv2.imwrite(path, source)
+            source = path
+        paths.append(source)
+
+    durations = []
+    started_all = time.perf_counter()
+    for _ in range(repeats):
+        for path in paths:
+            started = time.perf_counter()
+            pool.classify_batch([path], batch_size=1)
+            durations.append(time.perf_counter() - started)
+    elapsed = time.perf_counter() - started_all
+
+    summary = summarize(durations)
+    summary['images_per_sec'] = len(durations) / elapsed
+    return summary
+
+
+# Function to print how each stage moved relative to an earlier results file
+def print_comparison(results, baseline):
+    print(f"\nCompared with {baseline.get('timestamp', 'baseline')}:")
+    previous_stages = baseline.get('stages', {})
+    sections = [(stage, results['stages'][stage],
+                 previous_stages.get(stage) or previous_stages.get(STAGE_ALIASES.get(stage)))
+                for stage in STAGES]
+    sections.append(('end_to_end', results['end_to_end'], baseline.get('end_to_end')))
+    for name, current, previous in sections:
+        if not previous or not previous.get('p50_ms'):
+            continue
+        change = 100.0 * (current['p50_ms'] - previous['p50_ms']) / previous['p50_ms']
+        print(f"{name:>12}: p50 {previous['p50_ms']:.2f} -> {current['p50_ms']:.2f} ms ({change:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage latency of the capture -> classify pipeline")
+    parser.add_argument("--images", help="Directory of recorded images (default: synthetic frames)")
+    parser.add_argument("--count", type=int, default=16, help="Number of synthetic frames")
+    parser.add_argument("--camera", type=int, help="Read frames from this camera index instead")
+    parser.add_argument("--model", help="Path to the model (default: the backend's model)")
+    parser.add_argument("--backend", default=BACKEND, help="Inference backend name or 'auto'")
+    parser.add_argument("--format", default=CAPTURE_FORMAT, choices=sorted(CAPTURE_EXTENSIONS),
+                        help="Format captures are written in")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", default="pipeline_benchmark.json", help="Where to write the JSON results")
+    parser.add_argument("--compare", help="Earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    inputs = load_inputs(args.images, args.count)
+    if not inputs:
+        print("No images to benchmark.")
+        return
+
+    pool = InterpreterPool(args.model, size=1, num_threads=args.threads, backend=args.backend)
+    pool.classify_batch(inputs[:1], batch_size=1)  # Warm up
+
+    camera = cv2.VideoCapture(args.camera) if args.camera is not None else None
+    try:
+        with tempfile.TemporaryDirectory() as work_dir:
+            stages = time_stages(pool, inputs, args.repeats, work_dir, camera, args.format)
+            end_to_end = time_end_to_end(pool, inputs, args.repeats, work_dir)
+    finally:
+        if camera is not None:
+            camera.release()
+
+    results = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'host': platform.node(),
+        'machine': platform.machine(),
+        'backend': pool.backend_name,
+        'model': pool.model_path,
+        'threads': args.threads,
+        'format': args.format,
+        'images': len(inputs),
+        'repeats': args.repeats,
+        'stages': stages,
+        'end_to_end': end_to_end,
+    }
+
+    print(f"{len(inputs)} images x {args.repeats} repeats, backend {pool.backend_name}")
+    print(f"{'stage':>12} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for stage in STAGES:
+        s = stages[stage]
+        print(f"{stage:>12} {s['p50_ms']:>8.2f} {s['p95_ms']:>8.2f} {s['p99_ms']:>8.2f}")
+    print(f"{'end_to_end':>12} {end_to_end['p50_ms']:>8.2f} {end_to_end['p95_ms']:>8.2f} "
+          f"{end_to_end['p99_ms']:>8.2f}  ({end_to_end['images_per_sec']:.1f} images/sec)")
+
+    if args.compare:
+        with open(args.compare) as f:
+            print_comparison(results, json.load(f))
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
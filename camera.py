@@ -0,0 +1,283 @@
+import time
+import platform
+import threading
+import numpy as np
+import cv2
+from capture_writer import downscale
+
+# Largest preview shown on screen; bigger frames are downscaled before display
+PREVIEW_MAX_SIZE = (640, 480)
+
+# Capture settings; None leaves the driver's default
+CAMERA_RESOLUTION = None  # (width, height), e.g. (1280, 720)
+CAMERA_FPS = None  # e.g. 30
+CAMERA_FORMAT = None  # FourCC such as 'MJPG' or 'YUYV'
+
+# Seconds the device stays open after the last user lets go of it
+CAMERA_IDLE_TIMEOUT = 60.0
+
+# Recent frames kept for burst capture (about 1/6 s at 30 fps); 0 turns bursts off
+BURST_SIZE = 5
+
+
+# Function to score frames for sharpness: the variance of the Laplacian over the central
+# half of each frame, where the subject usually is. `frames` is an (N, H, W, 3) stack and
+# is scored in one pass; higher scores are sharper.
+def sharpness(frames):
+    count, height, width = frames.shape[:3]
+    # The green channel carries most of the luminance detail
+    region = frames[:, height // 4:height - height // 4, width // 4:width - width // 4, 1].astype(np.float32)
+    laplacian = (4 * region[:, 1:-1, 1:-1] - region[:, :-2, 1:-1] - region[:, 2:, 1:-1]
+                 - region[:, 1:-1, :-2] - region[:, 1:-1, 2:])
+    return laplacian.reshape(count, -1).var(axis=1)
+
+
+# Fixed-size ring of the most recent frames, stored in one preallocated array.
+# The array is allocated on the first frame, once the camera's frame size is known.
+class FrameRing:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._frames = None
+        self._next = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def clear(self):
+        self._next = 0
+        self._count = 0
+
+    def push(self, frame):
+        if self._frames is None or self._frames.shape[1:] != frame.shape:
+            self._frames = np.empty((self.capacity,) + frame.shape, dtype=frame.dtype)
+            self.clear()
+        np.copyto(self._frames[self._next], frame)
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    # Copy of the sharpest frame in the ring, or None when it is empty
+    def sharpest(self):
+        if self._count == 0:
+            return None
+        filled = self._frames[:self._count]
+        return filled[int(np.argmax(sharpness(filled)))].copy()
+
+
+# Reads frames from a cv2.VideoCapture on its own thread into a single-slot buffer.
+# Only the newest frame is kept: a frame replaced before the preview took it counts as dropped.
+class CameraStream:
+    def __init__(self, cap, burst_size=BURST_SIZE):
+        self.cap = cap
+        self.frames_captured = 0
+        self.frames_dropped = 0
+        self.read_errors = 0
+        self.fps = 0.0  # Frames read from the camera per second, over the last second
+
+        self._frame = None
+        self._ring = FrameRing(burst_size) if burst_size else None
+        self._sequence = 0
+        self._consumed_sequence = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def is_running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self.is_running():
+            return
+        self._stop_event.clear()
+        # Frames from before a pause are stale for a burst
+        if self._ring is not None:
+            with self._lock:
+                self._ring.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # Stop reading; waits at most one frame for the reader thread, so the device
+    # can be released safely afterwards
+    def stop(self):
+        if not self.is_running():
+            return
+        self._stop_event.set()
+        self._thread.join(timeout=1.0)
+        self._thread = None
+
+    # Newest frame and its sequence number, marking it as shown. (None, 0) before the first frame.
+    def read(self):
+        with self._lock:
+            self._consumed_sequence = self._sequence
+            return self._frame, self._sequence
+
+    # Newest frame without marking it as shown, e.g. for a still capture
+    def snapshot(self):
+        with self._lock:
+            return self._frame
+
+    # Sharpest of the last `burst_size` frames, for steadier handheld captures.
+    # Falls back to the newest frame when bursts are off.
+    def sharpest(self):
+        with self._lock:
+            if self._ring is None or len(self._ring) == 0:
+                return self._frame
+            return self._ring.sharpest()
+
+    def _run(self):
+        window_start = time.monotonic()
+        window_frames = 0
+        while not self._stop_event.is_set():
+            ret, frame = self.cap.read()
+            if not ret:
+                self.read_errors += 1
+                if self.read_errors == 1:
+                    print("Failed to capture frame")
+                self._stop_event.wait(0.01)
+                continue
+
+            # cap.read() returns a new array every call, so the frame can be handed over as is
+            with self._lock:
+                if self._sequence > self._consumed_sequence:
+                    self.frames_dropped += 1
+                self._frame = frame
+                if self._ring is not None:
+                    self._ring.push(frame)
+                self._sequence += 1
+            self.frames_captured += 1
+
+            window_frames += 1
+            elapsed = time.monotonic() - window_start
+            if elapsed >= 1.0:
+                self.fps = window_frames / elapsed
+                window_start = time.monotonic()
+                window_frames = 0
+
+
+# Function to shrink a frame to fit the preview (see capture_writer.downscale)
+def fit_preview(frame, max_size=PREVIEW_MAX_SIZE):
+    return downscale(frame, max_size)
+
+
+# Function to open the camera for this OS, trying the usual device indices
+def open_camera():
+    system = platform.system()
+
+    if system == 'Windows':
+        cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
+    elif system == 'Linux':  # This includes Raspberry Pi
+        cap = cv2.VideoCapture(0)  # Try index 0
+        if not cap.isOpened():
+            cap = cv2.VideoCapture(1)  # Try index 1 if 0 doesn't work
+            if not cap.isOpened():
+                cap = cv2.VideoCapture(-1)  # Let OpenCV pick any camera
+    else:
+        print(f"Unsupported OS: {system}")
+        return None
+
+    if not cap.isOpened():
+        print("Error: Cannot open camera")
+        return None
+    return cap
+
+
+# Function to apply resolution, frame rate and pixel format to an open camera.
+# The format goes first because V4L2 drivers reset the size when it changes.
+def configure_camera(cap, resolution=None, fps=None, pixel_format=None):
+    if pixel_format:
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*pixel_format))
+    if resolution:
+        cap.set(cv2.CAP_PROP_FRAME_WIDTH, resolution[0])
+        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, resolution[1])
+    if fps:
+        cap.set(cv2.CAP_PROP_FPS, fps)
+    # Keep the driver from queueing stale frames behind the newest one
+    cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+
+
+# Owns the one camera device for the whole app. The device is opened on first use and kept
+# open across page switches; when nobody is using it, reading stops straight away and the
+# device is released after `idle_timeout` seconds.
+class CameraManager:
+    def __init__(self, resolution=CAMERA_RESOLUTION, fps=CAMERA_FPS, pixel_format=CAMERA_FORMAT,
+                 idle_timeout=CAMERA_IDLE_TIMEOUT, burst_size=BURST_SIZE):
+        self.resolution = resolution
+        self.fps = fps
+        self.pixel_format = pixel_format
+        self.idle_timeout = idle_timeout
+        self.burst_size = burst_size
+        self._cap = None
+        self._stream = None
+        self._users = 0
+        self._idle_timer = None
+        self._lock = threading.Lock()
+
+    def is_open(self):
+        return self._cap is not None
+
+    # Start using the camera; returns a running CameraStream, or None if the camera cannot be opened
+    def acquire(self):
+        with self._lock:
+            self._cancel_idle_timer()
+            if self._cap is None:
+                cap = open_camera()
+                if cap is None:
+                    return None
+                configure_camera(cap, self.resolution, self.fps, self.pixel_format)
+                self._cap = cap
+                self._stream = CameraStream(cap, self.burst_size)
+            self._users += 1
+            self._stream.start()
+            return self._stream
+
+    # Stop using the camera; the device is suspended now and released after the idle timeout
+    def release(self):
+        with self._lock:
+            if self._users == 0:
+                return
+            self._users -= 1
+            if self._users > 0 or self._stream is None:
+                return
+            self._stream.stop()
+            self._idle_timer = threading.Timer(self.idle_timeout, self._close_if_idle)
+            self._idle_timer.daemon = True
+            self._idle_timer.start()
+
+    # Change capture settings, applying them right away if the device is open
+    def configure(self, resolution=None, fps=None, pixel_format=None):
+        with self._lock:
+            self.resolution = resolution or self.resolution
+            self.fps = fps or self.fps
+            self.pixel_format = pixel_format or self.pixel_format
+            if self._cap is None:
+                return
+            running = self._stream.is_running()
+            self._stream.stop()
+            configure_camera(self._cap, self.resolution, self.fps, self.pixel_format)
+            if running:
+                self._stream.start()
+
+    # Release the device immediately, e.g. when the app exits
+    def close(self):
+        with self._lock:
+            self._cancel_idle_timer()
+            self._close()
+
+    def _close_if_idle(self):
+        with self._lock:
+            if self._users == 0:
+                self._close()
+
+    def _close(self):
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream = None
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+            print("Camera released")
+
+    def _cancel_idle_timer(self):
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+            self._idle_timer = None
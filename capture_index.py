@@ -0,0 +1,200 @@
+import os
+import shutil
+import sqlite3
+import threading
+from datetime import datetime
+from PIL import Image
+
+# Index database, kept with the app's other databases so it works before the images
+# directory exists (and when that directory is read-only)
+CAPTURE_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".cache", "medplant", "captures.sqlite3")
+
+# Where earlier versions kept the index, inside the images directory
+LEGACY_INDEX_FILE = ".captures.sqlite3"
+
+CAPTURE_PREFIX = "captured_frame_"
+CAPTURE_TIME_FORMAT = "%Y%m%d_%H%M%S"
+
+_COLUMNS = ('file_name', 'captured_at', 'width', 'height', 'content_hash', 'predicted_class',
+            'confidence', 'latitude', 'longitude', 'uploaded', 'uploaded_at', 'original_bytes', 'upload_bytes')
+
+
+# Function to read the capture time encoded in a file name like captured_frame_20240101_120000.png,
+# or captured_frame_20240101_120000_123.png with milliseconds
+def capture_time(file_name):
+    stamp = os.path.splitext(file_name)[0][len(CAPTURE_PREFIX):]
+    seconds, _, millis = stamp[:15], stamp[15:16], stamp[16:]
+    try:
+        captured_at = datetime.strptime(seconds, CAPTURE_TIME_FORMAT)
+        if millis:
+            captured_at = captured_at.replace(microsecond=int(millis) * 1000)
+            return captured_at.isoformat(timespec='milliseconds')
+        return captured_at.isoformat()
+    except ValueError:
+        return None
+
+
+# Embedded SQLite index of the captures in one directory: when each was taken, its size and
+# content hash, the model's prediction, where it was taken and whether it has been uploaded.
+# Gallery filters and pages are indexed queries instead of directory scans.
+class CaptureIndex:
+    def __init__(self, images_dir, path=CAPTURE_INDEX_PATH):
+        self.images_dir = images_dir
+        self.path = path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Carry over an index left in the images directory by an earlier version
+        legacy_path = os.path.join(images_dir, LEGACY_INDEX_FILE)
+        if not os.path.exists(path) and os.path.exists(legacy_path):
+            shutil.copyfile(legacy_path, path)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS captures (
+                file_name TEXT PRIMARY KEY,
+                captured_at TEXT,
+                width INTEGER,
+                height INTEGER,
+                content_hash TEXT,
+                predicted_class TEXT,
+                confidence REAL,
+                latitude REAL,
+                longitude REAL,
+                uploaded INTEGER NOT NULL DEFAULT 0,
+                uploaded_at TEXT,
+                original_bytes INTEGER,
+                upload_bytes INTEGER
+            );
+            CREATE INDEX IF NOT EXISTS captures_captured_at ON captures (captured_at);
+            CREATE INDEX IF NOT EXISTS captures_class ON captures (predicted_class, captured_at);
+            CREATE INDEX IF NOT EXISTS captures_uploaded ON captures (uploaded, captured_at);
+        """)
+        # Add the upload size columns to index databases created before they existed
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(captures)")}
+        for column in ('original_bytes', 'upload_bytes'):
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE captures ADD COLUMN {column} INTEGER")
+        self._conn.commit()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            self._conn.execute(sql, params)
+            self._conn.commit()
+
+    # Add or update a capture; columns left as None keep their stored value
+    def record_capture(self, file_name, width=None, height=None, content_hash=None,
+                       latitude=None, longitude=None):
+        self._execute("""
+            INSERT INTO captures (file_name, captured_at, width, height, content_hash, latitude, longitude)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (file_name) DO UPDATE SET
+                width = COALESCE(excluded.width, width),
+                height = COALESCE(excluded.height, height),
+                content_hash = COALESCE(excluded.content_hash, content_hash),
+                latitude = COALESCE(excluded.latitude, latitude),
+                longitude = COALESCE(excluded.longitude, longitude)
+            """, (file_name, capture_time(file_name), width, height, content_hash, latitude, longitude))
+
+    # Store the model's prediction (a result dictionary from inference) for a capture
+    def record_prediction(self, file_name, result):
+        self.record_capture(file_name)
+        self._execute("UPDATE captures SET predicted_class = ?, confidence = ? WHERE file_name = ?",
+                      (result['class'], result['confidence'], file_name))
+
+    # Mark a capture as uploaded and, when it was transcoded first, record the size of the
+    # file on disk and of what was actually sent. The location stays what the capture recorded.
+    def record_upload(self, file_name, original_bytes=None, upload_bytes=None):
+        self.record_capture(file_name)
+        self._execute("UPDATE captures SET uploaded = 1, uploaded_at = ?, original_bytes = ?, upload_bytes = ? "
+                      "WHERE file_name = ?",
+                      (datetime.now().isoformat(timespec='seconds'), original_bytes, upload_bytes, file_name))
+
+    # Total bytes on disk and bytes sent over all uploaded captures with recorded sizes
+    def upload_savings(self):
+        with self._lock:
+            row = self._conn.execute("SELECT COALESCE(SUM(original_bytes), 0), COALESCE(SUM(upload_bytes), 0) "
+                                     "FROM captures WHERE upload_bytes IS NOT NULL").fetchone()
+        return row[0], row[1]
+
+    def remove(self, file_name):
+        self._execute("DELETE FROM captures WHERE file_name = ?", (file_name,))
+
+    # Everything known about one capture, as a dictionary, or None
+    def get(self, file_name):
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM captures WHERE file_name = ?", (file_name,)).fetchone()
+        return dict(row) if row else None
+
+    # File names of the captures matching the filters, by capture time.
+    # `uploaded` is True/False to filter on upload state, None for either.
+    def query(self, predicted_class=None, uploaded=None, newest_first=False, limit=None, offset=0):
+        conditions = []
+        params = []
+        if predicted_class is not None:
+            conditions.append("predicted_class = ?")
+            params.append(predicted_class)
+        if uploaded is not None:
+            conditions.append("uploaded = ?")
+            params.append(1 if uploaded else 0)
+
+        sql = "SELECT file_name FROM captures"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY captured_at DESC, file_name DESC" if newest_first else " ORDER BY captured_at, file_name"
+        if limit is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params.extend([limit, offset])
+
+        with self._lock:
+            return [row[0] for row in self._conn.execute(sql, params)]
+
+    # Whether a capture matches the same filters as query()
+    def matches(self, file_name, predicted_class=None, uploaded=None):
+        capture = self.get(file_name)
+        if capture is None:
+            return predicted_class is None and not uploaded
+        if predicted_class is not None and capture['predicted_class'] != predicted_class:
+            return False
+        if uploaded is not None and bool(capture['uploaded']) != uploaded:
+            return False
+        return True
+
+    # Predicted classes that occur among the captures, for filter menus
+    def classes(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT predicted_class FROM captures WHERE predicted_class IS NOT NULL "
+                "ORDER BY predicted_class")
+            return [row[0] for row in rows]
+
+    # Bring the index in line with the files on disk: add rows for new files (reading
+    # their dimensions from the image header) and drop rows for files that are gone
+    def sync_files(self, file_names):
+        file_names = set(file_names)
+        with self._lock:
+            known = {row[0] for row in self._conn.execute("SELECT file_name FROM captures")}
+
+        removed = known - file_names
+        if removed:
+            with self._lock:
+                self._conn.executemany("DELETE FROM captures WHERE file_name = ?", [(f,) for f in removed])
+                self._conn.commit()
+
+        for file_name in sorted(file_names - known):
+            width = height = None
+            try:
+                with Image.open(os.path.join(self.images_dir, file_name)) as image:
+                    width, height = image.size
+            except OSError as e:
+                print(f"Error reading {file_name}: {e}")
+            self.record_capture(file_name, width, height)
+
+    # DirectoryWatcher callback keeping the index in step with the directory
+    def on_directory_change(self, kind, file_name):
+        if kind == 'added':
+            self.record_capture(file_name)
+        else:
+            self.remove(file_name)
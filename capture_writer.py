@@ -0,0 +1,88 @@
+import os
+import queue
+import threading
+import cv2
+
+# Output settings for captures
+CAPTURE_FORMAT = 'jpeg'  # 'png', 'jpeg' or 'webp'
+CAPTURE_QUALITY = 92  # JPEG/WebP quality, 1-100
+CAPTURE_COMPRESSION = 3  # PNG compression level, 0 (fastest) to 9 (smallest)
+CAPTURE_MAX_SIZE = None  # (width, height) to downscale captures to fit, or None for full resolution
+
+# File extension written for each format
+CAPTURE_EXTENSIONS = {'png': '.png', 'jpeg': '.jpg', 'webp': '.webp'}
+
+
+# Function to build the cv2.imwrite parameters for a format
+def encode_params(image_format, quality=CAPTURE_QUALITY, compression=CAPTURE_COMPRESSION):
+    if image_format == 'png':
+        return [cv2.IMWRITE_PNG_COMPRESSION, compression]
+    if image_format == 'jpeg':
+        return [cv2.IMWRITE_JPEG_QUALITY, quality]
+    if image_format == 'webp':
+        return [cv2.IMWRITE_WEBP_QUALITY, quality]
+    raise ValueError(f"Unknown capture format {image_format!r}; expected one of {sorted(CAPTURE_EXTENSIONS)}")
+
+
+# Function to shrink a frame to fit `max_size` (width, height); smaller frames pass through
+def downscale(frame, max_size):
+    if max_size is None:
+        return frame
+    height, width = frame.shape[:2]
+    scale = min(max_size[0] / width, max_size[1] / height)
+    if scale >= 1.0:
+        return frame
+    return cv2.resize(frame, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+
+
+# Background writer so captured frames are downscaled, encoded and saved off the Tk thread
+class CaptureWriter:
+    def __init__(self, image_format=CAPTURE_FORMAT, quality=CAPTURE_QUALITY,
+                 compression=CAPTURE_COMPRESSION, max_size=CAPTURE_MAX_SIZE):
+        self.image_format = image_format
+        self.params = encode_params(image_format, quality, compression)
+        self.max_size = max_size
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # Extension of the files this writer produces, e.g. '.jpg'
+    @property
+    def extension(self):
+        return CAPTURE_EXTENSIONS[self.image_format]
+
+    # Number of captures queued or being written
+    @property
+    def pending(self):
+        return self._queue.unfinished_tasks
+
+    # Queue `frame` (OpenCV BGR) to be written to `path`, which should end in `extension`.
+    # Returns immediately; `on_saved(path, (width, height))` is called on the writer
+    # thread once the file exists, with the size actually written.
+    def save(self, frame, path, on_saved=None):
+        self._queue.put((frame, path, on_saved))
+
+    # Block until every queued frame has been written
+    def wait(self):
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            frame, path, on_saved = self._queue.get()
+            # Write under a temporary name and rename, so anything watching the
+            # directory never sees a half-written capture
+            directory, file_name = os.path.split(path)
+            temp_path = os.path.join(directory, ".tmp_" + file_name)
+            try:
+                frame = downscale(frame, self.max_size)
+                if cv2.imwrite(temp_path, frame, self.params):
+                    os.replace(temp_path, path)
+                    print(f"Image saved as {path}")
+                    if on_saved:
+                        on_saved(path, (frame.shape[1], frame.shape[0]))
+                else:
+                    print(f"Error: Failed to write {path}")
+            except Exception as e:
+                print(f"Error saving image {path}: {e}")
+            finally:
+                self._queue.task_done()
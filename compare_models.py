@@ -0,0 +1,77 @@
+import os
+import time
+import argparse
+import numpy as np
+from inference import InterpreterPool
+from backends import TFLITE_MODEL_PATH, available_backends
+from memory import resident_memory
+
+
+# Function to list the images in a folder
+def list_images(images_dir):
+    return [os.path.join(images_dir, f) for f in sorted(os.listdir(images_dir))
+            if f.lower().endswith(('.png', '.jpg', '.jpeg', '.webp'))]
+
+
+# Function to load a model and classify every image one at a time.
+# Returns the results plus per-image latencies and the memory the model added.
+def run_model(model_path, images, backend, num_threads):
+    memory_before = resident_memory()
+    pool = InterpreterPool(model_path, size=1, num_threads=num_threads, backend=backend)
+    memory_after = resident_memory()
+
+    pool.classify_batch(images[:1], batch_size=1)  # Warm up
+
+    results = []
+    latencies = []
+    for image in images:
+        started = time.perf_counter()
+        results.extend(pool.classify_batch([image], batch_size=1))
+        latencies.append(time.perf_counter() - started)
+
+    memory = memory_after - memory_before if memory_before is not None and memory_after is not None else None
+    return results, latencies, memory
+
+
+def format_memory(memory):
+    return f"{memory / (1 << 20):.1f} MB" if memory is not None else "n/a"
+
+
+def main():
+    tflite_backends = [name for name in available_backends() if name in ('tflite_runtime', 'tensorflow')]
+
+    parser = argparse.ArgumentParser(description="Compare a float model against its quantized version")
+    parser.add_argument("quantized", help="Path to the quantized (int8/uint8/float16) .tflite model")
+    parser.add_argument("--float", dest="float_model", default=TFLITE_MODEL_PATH, help="Path to the float model")
+    parser.add_argument("--images", default=".", help="Folder of sample images (default: current folder)")
+    parser.add_argument("--backend", default=tflite_backends[0] if tflite_backends else 'tflite_runtime')
+    parser.add_argument("--threads", type=int, default=1)
+    args = parser.parse_args()
+
+    images = list_images(args.images)
+    if not images:
+        print(f"No images found in {args.images}")
+        return
+
+    float_results, float_latencies, float_memory = run_model(args.float_model, images, args.backend, args.threads)
+    quant_results, quant_latencies, quant_memory = run_model(args.quantized, images, args.backend, args.threads)
+
+    print(f"{len(images)} images, backend {args.backend}, {args.threads} thread(s)")
+    print(f"{'':>10} {'p50 ms':>8} {'mean ms':>8} {'file':>10} {'memory':>10}")
+    for label, path, latencies, memory in (("float", args.float_model, float_latencies, float_memory),
+                                           ("quantized", args.quantized, quant_latencies, quant_memory)):
+        print(f"{label:>10} {np.median(latencies) * 1000:>8.1f} {np.mean(latencies) * 1000:>8.1f} "
+              f"{format_memory(os.path.getsize(path)):>10} {format_memory(memory):>10}")
+
+    agreement = [f['class_index'] == q['class_index'] for f, q in zip(float_results, quant_results)]
+    confidence_delta = [abs(f['confidence'] - q['confidence']) for f, q in zip(float_results, quant_results)]
+    print(f"Top-1 agreement: {sum(agreement)}/{len(agreement)} ({100.0 * np.mean(agreement):.1f}%)")
+    print(f"Mean confidence difference: {np.mean(confidence_delta):.4f}")
+
+    for image, f, q, same in zip(images, float_results, quant_results, agreement):
+        if not same:
+            print(f"  {os.path.basename(image)}: float={f['class']} quantized={q['class']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import os
+import threading
+
+# inotify is optional; without it (or off Linux) the watcher polls the directory's mtime
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+
+# Keeps an in-memory set of the files in a directory that match `matches(name)`, and tells
+# subscribers about each file added or removed. Changes come from inotify when available,
+# otherwise from polling, which only re-lists the directory when its mtime changes.
+class DirectoryWatcher:
+    def __init__(self, directory, matches, poll_interval=2.0):
+        self.directory = directory
+        self.matches = matches
+        self.poll_interval = poll_interval
+        self._files = set()
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._files = self._list_files()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread = None
+
+    # Sorted names of the matching files currently in the directory
+    def files(self):
+        with self._lock:
+            return sorted(self._files)
+
+    # `callback(kind, name)` is called with kind 'added' or 'removed', on the watcher thread
+    # or on whichever thread called file_added/file_removed
+    def subscribe(self, callback):
+        with self._lock:
+            self._listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    # Record a new file right away, e.g. after the app wrote it; repeated calls are ignored
+    def file_added(self, name):
+        self._apply('added', name)
+
+    # Record a deleted file right away, e.g. after the app removed it; repeated calls are ignored
+    def file_removed(self, name):
+        self._apply('removed', name)
+
+    def _apply(self, kind, name):
+        if not self.matches(name):
+            return
+        with self._lock:
+            if kind == 'added':
+                if name in self._files:
+                    return
+                self._files.add(name)
+            else:
+                if name not in self._files:
+                    return
+                self._files.discard(name)
+            listeners = list(self._listeners)
+
+        for callback in listeners:
+            try:
+                callback(kind, name)
+            except Exception as e:
+                print(f"Error handling {kind} file {name}: {e}")
+
+    def _list_files(self):
+        try:
+            return {name for name in os.listdir(self.directory) if self.matches(name)}
+        except OSError as e:
+            print(f"Error listing {self.directory}: {e}")
+            return set()
+
+    def _run(self):
+        if INotify is not None:
+            try:
+                self._run_inotify()
+                return
+            except OSError as e:
+                print(f"inotify unavailable for {self.directory} ({e}), polling instead")
+        self._run_polling()
+
+    def _run_inotify(self):
+        inotify = INotify()
+        added_flags = flags.CLOSE_WRITE | flags.MOVED_TO
+        removed_flags = flags.DELETE | flags.MOVED_FROM
+        inotify.add_watch(self.directory, added_flags | removed_flags)
+
+        # Catch anything that changed between the initial listing and the watch
+        self._sync(self._list_files())
+
+        try:
+            while not self._stop_event.is_set():
+                for event in inotify.read(timeout=1000):
+                    if event.mask & added_flags:
+                        self.file_added(event.name)
+                    elif event.mask & removed_flags:
+                        self.file_removed(event.name)
+        finally:
+            inotify.close()
+
+    def _run_polling(self):
+        last_mtime = None
+        while not self._stop_event.wait(self.poll_interval):
+            try:
+                mtime = os.stat(self.directory).st_mtime_ns
+            except OSError:
+                continue
+            if mtime == last_mtime:
+                continue
+            last_mtime = mtime
+            self._sync(self._list_files())
+
+    # Apply the difference between the known files and a fresh listing
+    def _sync(self, current):
+        with self._lock:
+            added = current - self._files
+            removed = self._files - current
+        for name in sorted(added):
+            self.file_added(name)
+        for name in sorted(removed):
+            self.file_removed(name)
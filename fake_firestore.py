@@ -0,0 +1,113 @@
+import time
+import operator
+import threading
+from collections import namedtuple
+from datetime import datetime, timezone
+
+# Stand-in for firestore.GeoPoint
+GeoPoint = namedtuple('GeoPoint', ['latitude', 'longitude'])
+
+_OPERATORS = {'==': operator.eq, '<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+
+
+# In-process stand-in for the small part of the Firestore client the app uses, for
+# benchmarks and offline runs. Every query costs `latency` seconds (one round trip)
+# plus `per_document` seconds for each document it returns; `round_trips` counts queries.
+class FakeFirestore:
+    def __init__(self, latency=0.05, per_document=0.0002):
+        self.latency = latency
+        self.per_document = per_document
+        self.round_trips = 0
+        self._documents = {}  # Document path -> data
+        self._lock = threading.Lock()
+
+    def collection(self, name):
+        return FakeCollection(self, name, None)
+
+    def collection_group(self, name):
+        return FakeQuery(self, lambda path, data: path.split('/')[-2] == name)
+
+    # Store a document directly, without the cost of a round trip
+    def seed(self, path, data):
+        self._documents[path] = dict(data)
+
+    def _run(self, matches):
+        with self._lock:
+            self.round_trips += 1
+            found = [(path, data) for path, data in self._documents.items() if matches(path, data)]
+        time.sleep(self.latency + self.per_document * len(found))
+        return [FakeSnapshot(self._reference(path), data) for path, data in found]
+
+    def _reference(self, path):
+        parts = path.split('/')
+        parent = None
+        for index in range(0, len(parts), 2):
+            collection = FakeCollection(self, parts[index], parent)
+            parent = FakeDocument(collection, parts[index + 1])
+        return parent
+
+
+class FakeQuery:
+    def __init__(self, db, matches):
+        self._db = db
+        self._matches = matches
+
+    # Field selection only trims what is sent over the wire; the fake returns everything
+    def select(self, field_paths):
+        return self
+
+    # Documents whose `field` compares to `value` with `op` ('==', '<', '<=', '>', '>=');
+    # like Firestore, documents without the field never match
+    def where(self, field, op, value):
+        compare = _OPERATORS[op]
+        matches = self._matches
+        return FakeQuery(self._db, lambda path, data: (matches(path, data) and field in data
+                                                       and compare(data[field], value)))
+
+    def stream(self):
+        return iter(self._db._run(self._matches))
+
+
+class FakeCollection(FakeQuery):
+    def __init__(self, db, name, parent):
+        self.id = name
+        self.parent = parent  # FakeDocument, or None for a top-level collection
+        self.path = f"{parent.path}/{name}" if parent is not None else name
+        prefix = self.path + '/'
+        super().__init__(db, lambda path, data: path.startswith(prefix) and '/' not in path[len(prefix):])
+
+    def document(self, document_id):
+        return FakeDocument(self, document_id)
+
+
+class FakeDocument:
+    def __init__(self, collection, document_id):
+        self.id = document_id
+        self.parent = collection
+        self.path = f"{collection.path}/{document_id}"
+        self._db = collection._db
+
+    def collection(self, name):
+        return FakeCollection(self._db, name, self)
+
+
+class FakeSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+# Function to fill a fake database with `plants` plants of `points` coordinates each
+def seed_plants(db, plants, points, updated_at=None):
+    updated_at = updated_at or datetime.now(timezone.utc)
+    for index in range(plants):
+        plant_id = f"plant_{index:05d}"
+        db.seed(f"plant_details/{plant_id}", {'Common Name': f"Plant {index}", 'updated_at': updated_at})
+        for point in range(points):
+            location = GeoPoint(10.0 + index * 0.001, 76.0 + point * 0.001)
+            db.seed(f"plant_details/{plant_id}/coordinates/location_{point}",
+                    {'location': location, 'updated_at': updated_at})
@@ -0,0 +1,302 @@
+import os
+import queue
+import bisect
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from tkinter import *
+from PIL import ImageTk
+from thumbnails import THUMBNAIL_SIZE, load_thumbnail
+
+# Threads decoding thumbnails in the background
+THUMBNAIL_WORKERS = 2
+
+# Decoded thumbnails handed to Tk per pass, and the pause between passes while more are waiting
+DRAIN_BATCH = 24
+DRAIN_INTERVAL_MS = 15
+
+
+# Virtualized grid of image thumbnails. Only the rows in view (plus `overscan` rows above
+# and below) have widgets; those tiles are recycled as the grid scrolls, so the number of
+# widgets stays constant however many images there are.
+# Thumbnails are decoded on worker threads; tiles show a placeholder until theirs arrives.
+# With a DirectoryWatcher the grid follows the directory, adding and removing single tiles
+# as files come and go, and `image_files` defaults to the watcher's listing.
+class VirtualGallery(Frame):
+    def __init__(self, master, images_dir, image_files=None, on_click=None, columns=4,
+                 tile_size=THUMBNAIL_SIZE, padding=5, overscan=1, cache_size=200, watcher=None,
+                 on_removed=None):
+        super().__init__(master)
+        self.images_dir = images_dir
+        self.on_click = on_click
+        self.on_removed = on_removed
+        self.watcher = watcher
+        self.columns = columns
+        self.tile_size = tile_size
+        self.padding = padding
+        self.overscan = overscan
+        self.cache_size = cache_size
+        self.cell_width = tile_size[0] + 2 * padding
+        self.cell_height = tile_size[1] + 2 * padding
+        self.selection = set()  # Highlighted image files
+
+        self.canvas = Canvas(self, highlightthickness=0, width=columns * self.cell_width)
+        self.scrollbar = Scrollbar(self, orient=VERTICAL, command=self._yview)
+        self.scrollbar.pack(side=RIGHT, fill=Y)
+        self.canvas.pack(side=LEFT, fill='both', expand=True)
+        self.canvas.config(yscrollcommand=self.scrollbar.set, yscrollincrement=self.cell_height // 4)
+        self.canvas.bind("<Configure>", lambda e: self._refresh())
+        self._bind_scroll(self.canvas)
+
+        self._placeholder = PhotoImage(width=tile_size[0], height=tile_size[1])
+        self._tiles = {}  # Image index -> tile label currently showing it
+        self._free_tiles = []  # Hidden tile labels ready for reuse
+        self._photos = OrderedDict()  # Image file -> PhotoImage, least recently used first
+
+        # Decoding happens on worker threads; PhotoImages can only be made on the Tk thread,
+        # so decoded images come back through a queue. The threads wake the Tk thread with a
+        # virtual event to drain it, so nothing runs while there is nothing to do.
+        self._executor = ThreadPoolExecutor(max_workers=THUMBNAIL_WORKERS)
+        self._pending = {}  # Image file -> Future of its decode
+        self._decoded = queue.Queue()
+        self._changes = queue.Queue()  # (kind, image file) from the watcher thread
+        self._drain_lock = threading.Lock()
+        self._drain_requested = False
+        self.bind("<<GalleryQueued>>", lambda e: self._drain())
+        # Picks up anything queued before the main loop started, when waking it fails
+        self._drain_id = self.after(DRAIN_INTERVAL_MS, self._drain)
+        self.bind("<Destroy>", self._on_destroy)
+
+        # Subscribe before listing so no change can fall in between; duplicates are ignored
+        if watcher is not None:
+            watcher.subscribe(self._on_directory_change)
+            if image_files is None:
+                image_files = watcher.files()
+
+        self.set_images(image_files or [])
+
+    @property
+    def rows(self):
+        return (len(self.image_files) + self.columns - 1) // self.columns
+
+    # Replace the list of images shown by the grid. `accepts(image_file)`, when given,
+    # decides whether files the watcher reports later belong in this (filtered) list.
+    def set_images(self, image_files, accepts=None):
+        self.image_files = list(image_files)
+        self.accepts = accepts
+        for index in list(self._tiles):
+            self._release_tile(index)
+        self.canvas.config(scrollregion=(0, 0, self.columns * self.cell_width, self.rows * self.cell_height))
+        self._refresh()
+
+    # Insert one image in sorted position; only the tiles in view are rebound
+    def add_image(self, image_file):
+        if self.accepts is not None and not self.accepts(image_file):
+            return
+        position = bisect.bisect_left(self.image_files, image_file)
+        if position < len(self.image_files) and self.image_files[position] == image_file:
+            return
+        self.image_files.insert(position, image_file)
+        self._relayout_from(position)
+
+    # Remove one image; only the tiles in view are rebound
+    def remove_image(self, image_file):
+        position = bisect.bisect_left(self.image_files, image_file)
+        if position >= len(self.image_files) or self.image_files[position] != image_file:
+            return
+        del self.image_files[position]
+        self._photos.pop(image_file, None)
+        self.selection.discard(image_file)
+        self._relayout_from(position)
+        if self.on_removed:
+            self.on_removed(image_file)
+
+    # Rebind the visible tiles at or after `position`, whose images shifted by one
+    def _relayout_from(self, position):
+        for index in list(self._tiles):
+            if index >= position:
+                self._release_tile(index)
+        self.canvas.config(scrollregion=(0, 0, self.columns * self.cell_width, self.rows * self.cell_height))
+        self._refresh()
+
+    # Called on the watcher's thread; the change is applied on the Tk thread by _drain
+    def _on_directory_change(self, kind, image_file):
+        self._changes.put((kind, image_file))
+        self._request_drain()
+
+    # Called from other threads after queueing work: wake the Tk thread once to run _drain
+    def _request_drain(self):
+        with self._drain_lock:
+            if self._drain_requested:
+                return
+            self._drain_requested = True
+        try:
+            self.event_generate("<<GalleryQueued>>", when='tail')
+        except (RuntimeError, TclError):
+            # No main loop yet, or the gallery is gone; the next request tries again
+            with self._drain_lock:
+                self._drain_requested = False
+
+    # Bytes held by the decoded thumbnails, for PageCache
+    def memory_estimate(self):
+        return len(self._photos) * self.tile_size[0] * self.tile_size[1] * 4
+
+    # Highlight `image_file` (or nothing, for None)
+    def set_selected(self, image_file):
+        self.set_selection([image_file] if image_file is not None else [])
+
+    # Highlight every file in `image_files`
+    def set_selection(self, image_files):
+        self.selection = set(image_files)
+        for label in self._tiles.values():
+            self._update_highlight(label)
+
+    def _bind_scroll(self, widget):
+        widget.bind("<MouseWheel>", self._on_mousewheel)  # Windows and macOS
+        widget.bind("<Button-4>", lambda e: self._scroll(-1))  # Linux
+        widget.bind("<Button-5>", lambda e: self._scroll(1))
+
+    def _on_mousewheel(self, event):
+        self._scroll(-1 if event.delta > 0 else 1)
+
+    def _scroll(self, direction):
+        self.canvas.yview_scroll(direction * 4, 'units')
+        self._refresh()
+
+    def _yview(self, *args):
+        self.canvas.yview(*args)
+        self._refresh()
+
+    # Indices of the images in (or just outside) the visible part of the canvas
+    def _visible_indices(self):
+        if not self.image_files:
+            return range(0)
+        top = self.canvas.canvasy(0)
+        height = max(self.canvas.winfo_height(), self.cell_height)
+        first_row = max(0, int(top // self.cell_height) - self.overscan)
+        last_row = min(self.rows - 1, int((top + height) // self.cell_height) + self.overscan)
+        return range(first_row * self.columns, min(len(self.image_files), (last_row + 1) * self.columns))
+
+    # Bind tiles to the images now in view and recycle the ones that scrolled out
+    def _refresh(self):
+        visible = self._visible_indices()
+        for index in list(self._tiles):
+            if index not in visible:
+                self._release_tile(index)
+        for index in visible:
+            if index not in self._tiles:
+                self._bind_tile(index)
+
+    def _acquire_tile(self):
+        if self._free_tiles:
+            return self._free_tiles.pop()
+        label = Label(self.canvas, image=self._placeholder)
+        label.window_id = self.canvas.create_window(0, 0, window=label, anchor='nw')
+        self._bind_scroll(label)
+        return label
+
+    def _release_tile(self, index):
+        label = self._tiles.pop(index)
+        # Skip decoding images that scrolled away before a worker got to them
+        future = self._pending.get(label.image_file)
+        if future is not None and future.cancel():
+            del self._pending[label.image_file]
+        label.image_file = None
+        label.config(image=self._placeholder)
+        self.canvas.itemconfigure(label.window_id, state='hidden')
+        self._free_tiles.append(label)
+
+    def _bind_tile(self, index):
+        label = self._acquire_tile()
+        image_file = self.image_files[index]
+        row, col = divmod(index, self.columns)
+
+        self.canvas.coords(label.window_id, col * self.cell_width + self.padding, row * self.cell_height + self.padding)
+        self.canvas.itemconfigure(label.window_id, state='normal')
+        label.image_file = image_file
+        label.config(image=self._photo(image_file))
+        label.bind("<Button-1>", lambda e, l=label, f=image_file: self._clicked(l, f))
+        self._update_highlight(label)
+        self._tiles[index] = label
+
+    def _clicked(self, label, image_file):
+        if self.on_click:
+            self.on_click(label, image_file)
+
+    def _update_highlight(self, label):
+        if label.image_file is not None and label.image_file in self.selection:
+            label.config(highlightbackground="blue", highlightthickness=2)
+        else:
+            label.config(highlightthickness=0)
+
+    # PhotoImage for a thumbnail, kept in a small LRU so scrolling back is cheap.
+    # Returns the placeholder and queues a background decode when it is not loaded yet.
+    def _photo(self, image_file):
+        if image_file in self._photos:
+            self._photos.move_to_end(image_file)
+            return self._photos[image_file]
+
+        if image_file not in self._pending:
+            image_path = os.path.join(self.images_dir, image_file)
+            self._pending[image_file] = self._executor.submit(self._decode, image_file, image_path)
+        return self._placeholder
+
+    # Runs on a worker thread
+    def _decode(self, image_file, image_path):
+        try:
+            image = load_thumbnail(image_path, self.tile_size)
+        except Exception as e:
+            print(f"Error loading image {image_file}: {e}")
+            image = None
+        self._decoded.put((image_file, image))
+        self._request_drain()
+
+    # Turn decoded thumbnails into PhotoImages and fill in the tiles waiting for them
+    def _drain(self):
+        if self._drain_id is not None:
+            self.after_cancel(self._drain_id)
+            self._drain_id = None
+        # Cleared before reading, so work queued from here on asks for another pass
+        with self._drain_lock:
+            self._drain_requested = False
+
+        while True:
+            try:
+                kind, image_file = self._changes.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'added':
+                self.add_image(image_file)
+            else:
+                self.remove_image(image_file)
+
+        for _ in range(DRAIN_BATCH):
+            try:
+                image_file, image = self._decoded.get_nowait()
+            except queue.Empty:
+                break
+            self._pending.pop(image_file, None)
+            if image is None:
+                continue
+
+            photo = ImageTk.PhotoImage(image)
+            self._photos[image_file] = photo
+            if len(self._photos) > self.cache_size:
+                self._photos.popitem(last=False)
+
+            for label in self._tiles.values():
+                if label.image_file == image_file:
+                    label.config(image=photo)
+
+        # More than one pass's worth decoded: let Tk breathe before the next pass
+        if not self._decoded.empty():
+            self._drain_id = self.after(DRAIN_INTERVAL_MS, self._drain)
+
+    def _on_destroy(self, event):
+        if event.widget is not self:
+            return
+        if self._drain_id is not None:
+            self.after_cancel(self._drain_id)
+        if self.watcher is not None:
+            self.watcher.unsubscribe(self._on_directory_change)
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,76 @@
+import time
+import platform
+import threading
+import pynmea2
+import serial
+
+# How old a fix may be and still count as where the device is
+GPS_FIX_MAX_AGE = 120.0
+
+# Pause before reopening the serial port after it failed
+GPS_RETRY_INTERVAL = 30.0
+
+
+# Function to get the serial port the GPS module is wired to on this OS
+def default_gps_port():
+    if platform.system() == "Windows":
+        return "COM3"  # Update this to your actual COM port on Windows
+    return "/dev/ttyS0"  # Raspberry Pi; update this if your GPS module is on a different port
+
+
+# Reads the GPS module on a background thread and keeps the latest fix. The port stays
+# open between sentences; only $..RMC sentences with a valid fix are used. Nothing is
+# printed per sentence, only when the port cannot be opened or fails.
+class GpsReader:
+    def __init__(self, port=None, baudrate=9600, max_age=GPS_FIX_MAX_AGE):
+        self.port = port or default_gps_port()
+        self.baudrate = baudrate
+        self.max_age = max_age
+        self._fix = None  # (latitude, longitude, time.monotonic() when read)
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread = None
+
+    # Latest fix as (latitude, longitude), or (None, None) if there is none recent enough
+    def current_fix(self):
+        fix = self._fix
+        if fix is None or time.monotonic() - fix[2] > self.max_age:
+            return None, None
+        return fix[0], fix[1]
+
+    def _run(self):
+        reported = False
+        while not self._stop_event.is_set():
+            try:
+                with serial.Serial(self.port, baudrate=self.baudrate, timeout=1) as ser:
+                    reported = False
+                    while not self._stop_event.is_set():
+                        self._handle(ser.readline())
+            except serial.SerialException as e:
+                # Report once until the port works again
+                if not reported:
+                    print(f"GPS unavailable on {self.port}: {e}")
+                    reported = True
+            self._stop_event.wait(GPS_RETRY_INTERVAL)
+
+    def _handle(self, line):
+        sentence = line.decode('ascii', errors='ignore').strip()
+        # RMC is the recommended minimum fix ($GPRMC, or $GNRMC from multi-system receivers)
+        if not sentence.startswith('$') or sentence[3:6] != 'RMC':
+            return
+        try:
+            message = pynmea2.parse(sentence)
+        except pynmea2.ParseError:
+            return
+        if message.status == 'A' and message.latitude and message.longitude:
+            self._fix = (message.latitude, message.longitude, time.monotonic())
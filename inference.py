@@ -0,0 +1,250 @@
+import os
+import sys
+import queue
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+import cv2
+from backends import BACKEND, create_backend, select_backend
+
+# Interpreter pool defaults: two interpreters sharing the Pi's four cores
+POOL_SIZE = 2
+NUM_THREADS = max(1, (os.cpu_count() or 1) // POOL_SIZE)
+
+# Class names for predictions
+class_names = ['Aloevera', 'Amla', 'Amruthaballi', 'Arali', 'Astma_weed', 'Badipala',
+               'Balloon_Vine', 'Bamboo', 'Beans', 'Betel', 'Bhrami', 'Bringaraja',
+               'Caricature', 'Castor', 'Catharanthus', 'Chakte', 'Chilly',
+               'Citron lime (herelikai)', 'Common rue(naagdalli)', 'Coriender',
+               'Curry', 'Doddpathre', 'Drumstick', 'Ekka', 'Eucalyptus',
+               'Gasagase', 'Ginger', 'Globe Amarnath', 'Guava', 'Henna',
+               'Hibiscus', 'Honge', 'Insulin', 'Jackfruit', 'Jasmine',
+               'Kambajala', 'Kasambruga', 'Lantana', 'Lemon', 'Lemongrass',
+               'Malabar_Nut', 'Malabar_Spinach', 'Mango', 'Marigold',
+               'Mint', 'Neem', 'Nelavembu', 'Padri', 'Palak(Spinach)',
+               'Papaya', 'Parijatha', 'Pea', 'Pepper', 'Pomoegranate',
+               'Pumpkin', 'Raddish', 'Rose', 'Sampige', 'Sapota',
+               'Seethaashoka', 'Seethapala', 'Spinach1', 'Tamarind',
+               'Taro', 'Tecoma', 'Thumbe', 'Tomato', 'Tulsi',
+               'Turmeric', 'ashoka', 'camphor', 'laptop', 'testtest']
+
+# Scale factor used to normalize pixels to [0, 1]
+_PIXEL_SCALE = np.float32(1.0 / 255.0)
+
+
+# Function to read a source image as a pixel array.
+# Returns the pixels and whether they are in OpenCV (BGR) channel order.
+def _read_pixels(source):
+    if isinstance(source, np.ndarray):
+        return source, True
+    if isinstance(source, Image.Image):
+        return np.asarray(source.convert('RGB')), False
+
+    frame = cv2.imread(source, cv2.IMREAD_COLOR)
+    if frame is None:
+        raise ValueError(f"Cannot read image {source}")
+    return frame, True
+
+
+# Function to build the conversion from RGB uint8 pixels to a model input row.
+# Float models get pixels / 255. Quantized models get round(pixels / 255 / scale + zero_point),
+# which for the usual scale of 1/255 is a plain copy (uint8) or a shift by the zero point (int8).
+# Returns convert(pixels, target); `shape` is the (height, width, 3) row shape.
+def make_input_converter(dtype, quantization=(0.0, 0), shape=None):
+    dtype = np.dtype(dtype)
+    scale, zero_point = quantization
+
+    if dtype.kind == 'f' or not scale:
+        def convert(pixels, target):
+            np.multiply(pixels, _PIXEL_SCALE, out=target, dtype=np.float32)
+        return convert
+
+    factor = 1.0 / (255.0 * scale)
+    if abs(factor - 1.0) < 1e-6:
+        def convert(pixels, target):
+            np.add(pixels, zero_point, out=target, dtype=np.int16, casting='unsafe')
+        return convert
+
+    info = np.iinfo(dtype)
+    float_scratch = np.empty(shape, dtype=np.float32)
+
+    def convert(pixels, target):
+        np.multiply(pixels, np.float32(factor), out=float_scratch, dtype=np.float32)
+        float_scratch += zero_point
+        np.rint(float_scratch, out=float_scratch)
+        np.clip(float_scratch, info.min, info.max, out=float_scratch)
+        np.copyto(target, float_scratch, casting='unsafe')
+    return convert
+
+
+_normalize = make_input_converter(np.float32)
+
+
+# Function to resize and normalize one image straight into `target`, a
+# (height, width, 3) array such as a row of an interpreter's input tensor.
+# `scratch` is a uint8 array of the same shape reused for the resized pixels.
+# `convert` writes the pixels in the model's input format (see make_input_converter).
+# `source` may be a file path, a PIL image or an OpenCV (BGR) frame.
+def preprocess_into(target, source, scratch, convert=_normalize):
+    height, width = target.shape[:2]
+
+    pixels, is_bgr = _read_pixels(source)
+    if pixels.shape[:2] != (height, width):
+        cv2.resize(pixels, (width, height), dst=scratch, interpolation=cv2.INTER_AREA)
+        pixels = scratch
+    if is_bgr:
+        pixels = pixels[..., ::-1]  # BGR -> RGB as a view, no copy
+
+    convert(pixels, target)
+    return target
+
+
+# Function to preprocess the image
+def preprocess_image(image_path, size=(256, 256)):
+    img_array = np.empty((1, size[1], size[0], 3), dtype=np.float32)
+    scratch = np.empty((size[1], size[0], 3), dtype=np.uint8)
+    preprocess_into(img_array[0], image_path, scratch)
+    return img_array
+
+
+# Function to turn one row of model output into a result dictionary
+def format_result(scores, top_k):
+    top_indices = np.argsort(scores)[::-1][:top_k]
+    predicted_class = int(top_indices[0])
+    return {
+        'class': class_names[predicted_class],
+        'class_index': predicted_class,
+        'confidence': float(scores[predicted_class]),
+        'top_k': [(class_names[int(i)], float(scores[i])) for i in top_indices]
+    }
+
+
+# One inference backend instance with its own scratch buffer and batch size.
+# Not thread safe: only use it while it is checked out of an InterpreterPool.
+class PooledInterpreter:
+    def __init__(self, backend_name, model_path=None, num_threads=NUM_THREADS):
+        self.backend = create_backend(backend_name, model_path, num_threads)
+        self.model_path = self.backend.model_path
+        self.input_height = self.backend.input_height
+        self.input_width = self.backend.input_width
+        self.scratch = np.empty((self.input_height, self.input_width, 3), dtype=np.uint8)
+        self.convert = make_input_converter(self.backend.input_dtype, self.backend.input_quantization,
+                                            self.scratch.shape)
+
+    # Resize the input to hold `batch_size` images
+    def resize_batch(self, batch_size):
+        self.backend.resize_batch(batch_size)
+
+    # Write a batch of images directly into the input tensor; rows past the end of `images` are zeroed
+    def _fill_input(self, images):
+        # The view must not outlive this function (see TFLiteBackend.input_view)
+        input_view = self.backend.input_view()
+        for i, source in enumerate(images):
+            preprocess_into(input_view[i], source, self.scratch, self.convert)
+        input_view[len(images):] = 0
+
+    # Classify up to `batch_size` images with a single invoke()
+    def classify(self, images, top_k=3):
+        # A partial batch is zero padded instead of resizing the input tensor again
+        self._fill_input(images)
+        output_data = self.backend.run()
+        return [format_result(scores, top_k) for scores in output_data[:len(images)]]
+
+
+# Fixed set of interpreters handed out to concurrent classification jobs
+# (gallery batches, the live preview, headless runs).
+# `backend` is a name from backends.BACKENDS or "auto".
+class InterpreterPool:
+    def __init__(self, model_path=None, size=POOL_SIZE, num_threads=NUM_THREADS, backend=BACKEND):
+        if size < 1:
+            raise ValueError("Pool size must be at least 1")
+        self.size = size
+        self.num_threads = num_threads
+        self.backend_name = select_backend(backend)
+        self._idle = queue.Queue()
+        for _ in range(size):
+            runner = PooledInterpreter(self.backend_name, model_path, num_threads)
+            self._idle.put(runner)
+        self.model_path = runner.model_path
+
+    # Check out an interpreter for exclusive use, waiting until one is free
+    @contextmanager
+    def acquire(self, timeout=None):
+        runner = self._idle.get(timeout=timeout)
+        try:
+            yield runner
+        finally:
+            self._idle.put(runner)
+
+    def _classify_chunk(self, chunk, batch_size, top_k):
+        with self.acquire() as runner:
+            runner.resize_batch(batch_size)
+            return runner.classify(chunk, top_k)
+
+    # Classify images with one invoke() per batch, spreading batches over the pool.
+    # Returns one result dictionary per image, in input order.
+    def classify_batch(self, images, batch_size=8, top_k=3):
+        images = list(images)
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if not images:
+            return []
+
+        batch_size = min(batch_size, len(images))
+        chunks = [images[i:i + batch_size] for i in range(0, len(images), batch_size)]
+
+        if len(chunks) == 1 or self.size == 1:
+            results = [self._classify_chunk(chunk, batch_size, top_k) for chunk in chunks]
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.size, len(chunks))) as executor:
+                results = list(executor.map(lambda chunk: self._classify_chunk(chunk, batch_size, top_k),
+                                            chunks))
+
+        return [result for chunk_results in results for result in chunk_results]
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+# Function to get the shared interpreter pool, loading the model on first use
+def get_pool():
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = InterpreterPool()
+        return _default_pool
+
+
+# Function to get the shared interpreter pool if it is already loaded, otherwise None
+def current_pool():
+    with _default_pool_lock:
+        return _default_pool
+
+
+# Function to replace the shared interpreter pool with a differently sized one
+def configure_pool(size=POOL_SIZE, num_threads=NUM_THREADS, model_path=None, backend=BACKEND):
+    global _default_pool
+    pool = InterpreterPool(model_path, size, num_threads, backend)
+    with _default_pool_lock:
+        _default_pool = pool
+    return pool
+
+
+# Function to classify several images with one interpreter.invoke() per batch.
+# `images` may contain file paths, PIL images or OpenCV (BGR) frames.
+# Returns one result dictionary per image, in input order.
+def classify_batch(images, batch_size=8, top_k=3):
+    return get_pool().classify_batch(images, batch_size, top_k)
+
+
+# Classify images from the command line without starting the UI
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python inference.py IMAGE [IMAGE ...]")
+        sys.exit(1)
+
+    for path, result in zip(sys.argv[1:], classify_batch(sys.argv[1:])):
+        print(f"{path}: {result['class']} ({result['confidence']:.2f})")
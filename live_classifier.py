@@ -0,0 +1,81 @@
+import threading
+import time
+from inference import classify_batch
+
+# How many preview frames per second the live mode classifies
+LIVE_INFERENCE_FPS = 2.0
+
+
+# Background worker that classifies the most recent camera preview frame.
+# Frames submitted while the worker is busy replace each other (latest frame wins),
+# so the model never falls behind the camera and the Tk loop never waits on it.
+class LiveClassifier:
+    def __init__(self, rate=LIVE_INFERENCE_FPS):
+        self.rate = rate
+        self.latest_result = None
+        self.frames_classified = 0
+        self.frames_dropped = 0
+        self._frame = None
+        self._lock = threading.Lock()
+        self._frame_ready = threading.Event()
+        self._stop_event = None
+        self._thread = None
+
+    def is_running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self.is_running():
+            return
+        self.latest_result = None
+        # Each run gets its own stop event so a worker that is still finishing
+        # an invoke() after stop() cannot be revived by a quick restart
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop_event,), daemon=True)
+        self._thread.start()
+
+    # Stop the worker without joining it, so the Tk thread is never blocked on an invoke()
+    def stop(self):
+        if not self.is_running():
+            return
+        self._stop_event.set()
+        self._frame_ready.set()  # Wake the worker so it can exit
+        self._thread = None
+        with self._lock:
+            self._frame = None
+
+    # Hand the newest preview frame to the worker, replacing any frame it has not picked up yet
+    def submit(self, frame):
+        with self._lock:
+            if self._frame is not None:
+                self.frames_dropped += 1
+            self._frame = frame
+        self._frame_ready.set()
+
+    def _run(self, stop_event):
+        while not stop_event.is_set():
+            self._frame_ready.wait()
+            if stop_event.is_set():
+                break
+
+            with self._lock:
+                frame = self._frame
+                self._frame = None
+                self._frame_ready.clear()
+            if frame is None:
+                continue
+
+            started = time.monotonic()
+            try:
+                result = classify_batch([frame], batch_size=1)[0]
+            except Exception as e:
+                print(f"Error classifying live frame: {e}")
+            else:
+                if not stop_event.is_set():
+                    self.latest_result = result
+                    self.frames_classified += 1
+
+            # Wait out the rest of the interval so the model runs at `rate`
+            remaining = 1.0 / self.rate - (time.monotonic() - started)
+            if remaining > 0:
+                stop_event.wait(remaining)
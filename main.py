@@ -9,6 +9,7 @@ from decimal import Decimal, getcontext
 import geocoder  # Import geocoder library for location
 from PIL import Image, ImageTk
 import os
+import mimetypes
 from google.cloud.storage import bucket
 import firebase_admin
 from firebase_admin import credentials, firestore, storage
@@ -16,10 +17,24 @@ import pynmea2
 from tkinter import filedialog, messagebox
 import numpy as np
 from PIL import Image
-import tensorflow as tf
 import cv2
 from tkintermapview import TkinterMapView
 import serial
+from inference import classify_batch
+from prediction_cache import classify_cached, get_cache, hash_file
+from capture_writer import CaptureWriter, CAPTURE_EXTENSIONS
+from thumbnails import remove_thumbnail
+from gallery import VirtualGallery
+from directory_watcher import DirectoryWatcher
+from capture_index import CaptureIndex
+from live_classifier import LiveClassifier
+from camera import CameraManager, fit_preview
+from gps import GpsReader
+from pages import PageCache
+from plant_markers import sync_markers, watch_markers, UPDATED_FIELD
+from marker_cache import MarkerCache
+from upload_queue import UploadQueue, upload_resumable
+from transcode import transcode_for_upload, remove_transcoded
 
 # from roboflow import Roboflow
 #
@@ -47,62 +62,44 @@ except Exception as e:
     print(f"Error initializing Firestore: {e}")
 
 
-# Global variables for threading and camera handling
-camera_thread = None
-inference_thread = None
-cap = None
-stop_event = None
-
-# Load TFLite model
-
-interpreter = tf.lite.Interpreter(model_path="assets\model.tflite")
-interpreter.allocate_tensors()
-
-# Get input and output tensors
-input_details = interpreter.get_input_details()
-output_details = interpreter.get_output_details()
-
-# Class names for predictions
-class_names = ['Aloevera', 'Amla', 'Amruthaballi', 'Arali', 'Astma_weed', 'Badipala',
-               'Balloon_Vine', 'Bamboo', 'Beans', 'Betel', 'Bhrami', 'Bringaraja',
-               'Caricature', 'Castor', 'Catharanthus', 'Chakte', 'Chilly',
-               'Citron lime (herelikai)', 'Common rue(naagdalli)', 'Coriender',
-               'Curry', 'Doddpathre', 'Drumstick', 'Ekka', 'Eucalyptus',
-               'Gasagase', 'Ginger', 'Globe Amarnath', 'Guava', 'Henna',
-               'Hibiscus', 'Honge', 'Insulin', 'Jackfruit', 'Jasmine',
-               'Kambajala', 'Kasambruga', 'Lantana', 'Lemon', 'Lemongrass',
-               'Malabar_Nut', 'Malabar_Spinach', 'Mango', 'Marigold',
-               'Mint', 'Neem', 'Nelavembu', 'Padri', 'Palak(Spinach)',
-               'Papaya', 'Parijatha', 'Pea', 'Pepper', 'Pomoegranate',
-               'Pumpkin', 'Raddish', 'Rose', 'Sampige', 'Sapota',
-               'Seethaashoka', 'Seethapala', 'Spinach1', 'Tamarind',
-               'Taro', 'Tecoma', 'Thumbe', 'Tomato', 'Tulsi',
-               'Turmeric', 'ashoka', 'camphor', 'laptop', 'testtest']
-
-# Function to preprocess the image
-def preprocess_image(image_path):
-    img = Image.open(image_path).convert('RGB')
-    img = img.resize((256, 256))  # Resize to model input size
-    img_array = np.array(img).astype('float32') / 255.0  # Normalize
-    img_array = np.expand_dims(img_array, axis=0)  # Expand dimensions
-    return img_array
-
-# Function to classify the image
-def classify_image(image_path):
-    input_data = preprocess_image(image_path)
-    interpreter.set_tensor(input_details[0]['index'], input_data)
-    interpreter.invoke()
-    output_data = interpreter.get_tensor(output_details[0]['index'])
-    predicted_class = np.argmax(output_data[0])
-    confidence = output_data[0][predicted_class]
+# How often the camera preview is redrawn (~30 fps)
+DISPLAY_INTERVAL_MS = 33
+
+# Location used for uploads when the capture has none
+DEFAULT_LATITUDE = 50.0
+DEFAULT_LONGITUDE = 50.0
+
+# Saves captured frames to disk in the background
+capture_writer = CaptureWriter()
+
+# Latest GPS fix, read in the background so captures get their location without waiting
+gps_reader = GpsReader()
+
+# Owns the camera across page switches; opened on first use, released after it sits idle
+camera_manager = CameraManager()
+
+# Function to classify the image.
+# `image` is a file path or an in-memory OpenCV (BGR) frame; `display_image` is an
+# optional PIL image of the same picture so the popup does not have to decode it again.
+def classify_image(image, display_image=None):
+    if isinstance(image, np.ndarray):
+        # Frames are never seen twice, so they skip the prediction cache
+        result = classify_batch([image], batch_size=1)[0]
+        if display_image is None:
+            display_image = Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+    else:
+        result = classify_cached([image], batch_size=1)[0]
+        if is_indexed_capture(image):
+            capture_index.record_prediction(os.path.basename(image), result)
+        if display_image is None:
+            display_image = Image.open(image)
 
     # Create a new window to display the image and prediction result
     result_window = Toplevel()
     result_window.title("Prediction Result")
 
-    # Load and display the image
-    img = Image.open(image_path)
-    img = img.resize((256, 256))  # Resize to fit the display
+    # Display the image
+    img = display_image.resize((256, 256))  # Resize to fit the display
     img_tk = ImageTk.PhotoImage(img)
 
     img_label = Label(result_window, image=img_tk)
@@ -110,7 +107,7 @@ def classify_image(image_path):
     img_label.pack()
 
     # Show prediction result in the popup
-    result_text = f"Predicted Class: {class_names[predicted_class]}\nConfidence: {confidence:.2f}"
+    result_text = f"Predicted Class: {result['class']}\nConfidence: {result['confidence']:.2f}"
     prediction_label = Label(result_window, text=result_text, font=("Arial", 14))
     prediction_label.pack(pady=10)
 
@@ -118,165 +115,14 @@ def classify_image(image_path):
     close_button = Button(result_window, text="Close", command=result_window.destroy)
     close_button.pack(pady=5)
 
-# def showCamera():
-#     global camera_thread
-#     global inference_thread
-#     global cap
-#     global stop_event
-#     global camera_label
-#
-#     system = platform.system()
-#
-#     # Initialize camera capture based on OS
-#     if system == 'Windows':
-#         cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
-#     elif system == 'Linux':  # This includes Raspberry Pi
-#         cap = cv2.VideoCapture(0)
-#         if not cap.isOpened():
-#             cap = cv2.VideoCapture(1)
-#             if not cap.isOpened():
-#                 cap = cv2.VideoCapture(-1)
-#     else:
-#         print(f"Unsupported OS: {system}")
-#         return
-#
-#     # Check if the camera was successfully opened
-#     if not cap.isOpened():
-#         print("Error: Cannot open camera")
-#         return
-#
-#     stop_event = threading.Event()
-#     frame_queue = queue.Queue(maxsize=10)
-#
-#     def capture_frames():
-#         while not stop_event.is_set():
-#             ret, frame = cap.read()
-#             if ret:
-#                 frame = cv2.resize(frame, (640, 480))
-#                 if not frame_queue.full():
-#                     frame_queue.put(frame)
-#             else:
-#                 print("Failed to capture frame")
-#                 break
-#
-#     def perform_inference():
-#         while not stop_event.is_set():
-#             if not frame_queue.empty():
-#                 frame = frame_queue.get()
-#                 try:
-#                     infer_and_update(frame)
-#                 except Exception as e:
-#                     print(f"Error processing frame: {e}")
-#
-#     # Start the threads
-#     camera_thread = threading.Thread(target=capture_frames, daemon=True)
-#     inference_thread = threading.Thread(target=perform_inference, daemon=True)
-#
-#     camera_thread.start()
-#
-#     # Define the capture_image function
-#     def capture_image():
-#         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-#
-#         # Directory to save captured images
-#         if platform.system() == "Windows":
-#             save_dir = 'C:/raspberry_images'
-#         else:  # Assuming it's a Raspberry Pi or Linux-based system
-#             save_dir = '/home/mehant/Pictures'
-#
-#         if not os.path.exists(save_dir):
-#             os.makedirs(save_dir)
-#
-#         image_filename = os.path.join(save_dir, f'captured_frame_{timestamp}.png')
-#
-#         try:
-#             ret, frame = cap.read()
-#             if ret:
-#                 cv2.imwrite(image_filename, frame)
-#                 print(f"Image captured and saved as {image_filename}")
-#
-#                 if os.path.exists(image_filename):
-#                     image = Image.open(image_filename)
-#                     tk_image = ImageTk.PhotoImage(image)
-#                     camera_label.config(image=tk_image)
-#                     camera_label.image = tk_image
-#                 else:
-#                     print("Error: Captured image not found.")
-#             else:
-#                 print("Error: Failed to capture image.")
-#         except Exception as e:
-#             print(f"Error capturing image: {e}")
-#
-#     # UI setup for camera feed and capture button
-#     overlay_frame = Frame(main_frame)
-#     overlay_frame.pack(fill='both', expand=True)
-#
-#     camera_label = Label(overlay_frame)
-#     camera_label.pack(fill='both', expand=True)
-#
-#     capture_button = Button(overlay_frame, text="Capture Image", command=capture_image)
-#     capture_button.place(relx=0.5, rely=0.9, anchor='center', width=150, height=50)
-#
-#     # Add a delay to ensure the camera is ready before starting the inference thread
-#     time.sleep(1)
-#     inference_thread.start()
-#     def process_frame(frame):
-#             # Resize the frame to the input size expected by the model
-#             input_size = (416, 416)  # Example size; adjust based on your model's requirements
-#             small_frame = frame
-#
-#             # Convert the frame to the format expected by the model
-#             input_image = frame
-#
-#             # Perform inference using the Roboflow model
-#             predictions = model.predict(input_image).json()
-#
-#             predictions_list = []
-#             for prediction in predictions['predictions']:
-#                 x = int(prediction['x'])
-#                 y = int(prediction['y'])
-#                 width = int(prediction['width'])
-#                 height = int(prediction['height'])
-#                 label = prediction['class']
-#                 confidence = prediction['confidence']
-#
-#                 start_point = (x - width // 2, y - height // 2)
-#                 end_point = (x + width // 2, y + height // 2)
-#
-#                 prediction_dict = {
-#                     'x': x,
-#                     'y': y,
-#                     'width': width,
-#                     'height': height,
-#                     'class': label,
-#                     'confidence': confidence
-#                 }
-#                 predictions_list.append(prediction_dict)
-#
-#                 # Draw bounding box on the small_frame (optional visualization)
-#                 color = (0, 255, 0)  # Green color for bounding box
-#                 thickness = 2  # Thickness of bounding box lines
-#                 cv2.rectangle(small_frame, start_point, end_point, color, thickness)
-#
-#                 # Put the label above the bounding box
-#                 cv2.putText(small_frame, f"{label} ({confidence:.2f})", (start_point[0], start_point[1] - 10),
-#                             cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-#
-#             return {'predictions': predictions_list}, small_frame
-#
-#     def infer_and_update(frame):
-#         # Perform inference and process the result
-#         result, small_frame = process_frame(frame)
-#
-#         # Convert the OpenCV frame (BGR) to a format suitable for Tkinter (RGB)
-#         cv2image = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
-#         img = Image.fromarray(cv2image)
-#         imgtk = ImageTk.PhotoImage(image=img)
-#
-#         # Update the UI with the new image
-#         camera_label.imgtk = imgtk
-#         camera_label.config(image=imgtk)
-#
+    return result
+
+
+# Function to draw the live prediction on top of an RGB preview frame
+def draw_prediction(frame, result):
+    text = f"{result['class']} ({result['confidence']:.2f})"
+    cv2.putText(frame, text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 4)
+    cv2.putText(frame, text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
 
 def getLoc():
     try:
@@ -334,68 +180,100 @@ getcontext().prec = 50
 gallery_selected = True
 camera_selected = False
 map_selected = False
-cache = {}
-data_queue = queue.Queue()  # Queue for safely passing data between threads
+# Marker changes for the map from background threads: (upserted points, removed paths, replace)
+data_queue = queue.Queue()
+
+# Markers from the last sync are kept on disk, so the map draws before the network answers.
+# Points are keyed by coordinates document path: {path: (name, latitude, longitude)}.
+marker_cache = MarkerCache()
+cache = {"points": marker_cache.points()}
+marker_watches = []  # Realtime listeners keeping the marker cache current
+
+
+# Function for background threads to wake the Tk thread after queueing work for it.
+# Before the main loop runs this fails, and the first check_queue picks the work up instead.
+def notify_ui():
+    try:
+        root.event_generate('<<QueueUpdated>>', when='tail')
+    except (RuntimeError, TclError):
+        pass
 
 
-# Function to fetch data in a background thread
+# Function to fetch data in a background thread.
+# Only plants and coordinates changed since the last sync are fetched.
 def fetch_plant_data():
-    plant_collection = db.collection('plant_details')
-    docs = plant_collection.stream()
-
-    markers = []  # List to store marker information
-    i = 0
-    for doc in docs:
-        data = doc.to_dict()
-        plant_ref = db.collection('plant_details').document(doc.id)
-        coordinates_ref = plant_ref.collection('coordinates')
-        plantCoords = coordinates_ref.stream()
-
-        common_name = data.get('Common Name')
-        print(f"{i}. Getting location and common name for {common_name}")
-
-        coordinates = []
-        for plantCoord in plantCoords:
-            location = plantCoord.to_dict().get('location')
-            print(f"{i}. Lat:{location.latitude} Lon:{location.longitude}")
-            if location:
-                coordinates.append((location.latitude, location.longitude))
-                print(f"GeoPoint: Latitude = {location.latitude}, Longitude = {location.longitude}")
-
-        if coordinates and common_name:
-            print("Got location and common name")
-            markers.append({"name": common_name, "coordinates": coordinates})
-        i += 1
-
-    data_queue.put(markers)  # Pass the data to the main thread via the queue
-    print("Data fetched and added to queue.")
-
-
-# Function to fetch and cache data in a separate thread
+    started = time.perf_counter()
+    try:
+        sync_markers(db, marker_cache)
+    except Exception as e:
+        print(f"Error syncing markers: {e}")
+        return
+
+    points = marker_cache.points()
+    data_queue.put((points, set(), True))  # Pass the data to the main thread via the queue
+    notify_ui()
+    print(f"Fetched {len(points)} markers in {time.perf_counter() - started:.2f}s, added to queue.")
+
+
+# Function to follow plant changes as they happen, once the initial sync is done
+def watch_plant_data():
+    global marker_watches
+
+    def on_change(upserted, removed):
+        data_queue.put((upserted, removed, False))
+        notify_ui()
+
+    try:
+        marker_watches = watch_markers(db, marker_cache, on_change)
+    except Exception as e:
+        print(f"Error starting marker listeners: {e}")
+
+
+# Function to fetch and cache data in a separate thread, then keep it current
 def initialize_cache():
     def fetch_and_cache():
         fetch_plant_data()
+        watch_plant_data()
 
-    thread = threading.Thread(target=fetch_and_cache)
+    thread = threading.Thread(target=fetch_and_cache, daemon=True)
     thread.start()
 
 
-# Function to periodically check the queue and update the UI
-def check_queue():
-    try:
-        markers = data_queue.get_nowait()
-        cache["markers"] = markers
-        print("Data retrieved from queue and cached.")
-        if map_selected:
-            show_map()
-    except queue.Empty:
-        pass
+# Function to apply marker changes to the cached points and to the map, if it is open.
+# With `replace`, points missing from `upserted` are removed.
+def apply_marker_changes(upserted, removed, replace=False):
+    points = cache["points"]
+    if replace:
+        removed = set(points) - set(upserted)
+    upserted = {path: point for path, point in upserted.items() if points.get(path) != point}
+    removed = {path for path in removed if path in points}
+    if not upserted and not removed:
+        return
 
-    root.after(100, check_queue)  # Check the queue every 100ms
+    for path in removed:
+        del points[path]
+    points.update(upserted)
+    print(f"Markers: {len(upserted)} added or moved, {len(removed)} removed")
 
+    map_page = pages.get('map')
+    if map_page is not None:
+        map_page.update_points(upserted, removed)
 
-# Example: Start periodic cache refresh every hour
-initialize_cache()
+
+# Function to apply what background threads queued for the UI; runs on <<QueueUpdated>>
+def check_queue():
+    while True:
+        try:
+            apply_marker_changes(*data_queue.get_nowait())
+        except queue.Empty:
+            break
+
+    # Show only the latest upload progress
+    event = None
+    while not upload_events.empty():
+        event = upload_events.get_nowait()
+    if event is not None:
+        show_upload_status(*event)
 
 
 def get_current_location():
@@ -403,31 +281,48 @@ def get_current_location():
     return g.latlng  # Returns a list [latitude, longitude]
 
 
-def show_map():
-    for widget in main_frame.winfo_children():
-        widget.destroy()
+# Function to build the map page. The page stays alive between visits, keeping its tiles,
+# and `update_points` adds and removes single markers as plant data changes.
+def build_map_page(parent):
+    page = Frame(parent)
 
-    markers = cache.get("markers", None)  # Use cached data if available
+    points = cache["points"]  # Use cached data if available
     current_location = get_current_location()
 
-    map_widget = TkinterMapView(main_frame, width=800, height=600, corner_radius=0)
+    map_widget = TkinterMapView(page, width=800, height=600, corner_radius=0)
     map_widget.pack(fill="both", expand=True)
     if current_location:
         lat, lon = current_location
         map_widget.set_position(lat, lon)
         map_widget.set_zoom(10)
         map_widget.set_marker(lat, lon, text="You")
-
-    if markers:
-        for marker in markers:
-            for coord in marker["coordinates"]:
-                latitude = Decimal(coord[0])
-                longitude = Decimal(coord[1])
-                map_widget.set_marker(latitude, longitude, text=marker["name"])
-    else:
+    elif not points:
         map_widget.set_position(0, 0)
         map_widget.set_zoom(1)
 
+    plant_markers = {}  # Coordinates document path -> map marker
+
+    def update_points(upserted, removed):
+        for path in set(removed) | set(upserted):
+            plant_marker = plant_markers.pop(path, None)
+            if plant_marker is not None:
+                plant_marker.delete()
+        for path, (name, latitude, longitude) in upserted.items():
+            plant_markers[path] = map_widget.set_marker(Decimal(latitude), Decimal(longitude), text=name)
+
+    update_points(points, ())
+    page.update_points = update_points
+    # Downloaded tiles are kept as 256x256 images for as long as the map lives
+    page.memory_estimate = lambda: len(getattr(map_widget, 'tile_image_cache', {})) * 256 * 256 * 4
+    return page
+
+
+# Function to load every navigation icon, plain and selected, once at startup.
+# Returns a dictionary keyed by (name, selected).
+def load_icons(names, size=(32, 32)):
+    return {(name, selected): createIcon(f"assets/{name}", selected, size)
+            for name in names for selected in (False, True)}
+
 
 # Function to create resized icon images for Tkinter buttons
 def createIcon(path, selected, size=(32, 32)):
@@ -446,15 +341,20 @@ capslock = False
 current_text_field = None
 
 
+# Function to open the upload form for an image; the form is a one-off page that is
+# destroyed when the user navigates away
 def open_in_app_keyboard(img_path):
-    global main_frame, current_text_field
+    pages.discard('upload')
+    pages.show('upload', lambda parent: build_upload_page(parent, img_path), transient=True)
 
-    # Clear the main frame
-    for widget in main_frame.winfo_children():
-        widget.destroy()
+
+def build_upload_page(parent, img_path):
+    global current_text_field
+
+    page = Frame(parent)
 
     # Create the keyboard window frame
-    keyboard_window = Frame(main_frame)
+    keyboard_window = Frame(page)
     keyboard_window.pack()
 
     keyboard_window.grid_rowconfigure(1, weight=1)  # Row for the image and text fields
@@ -482,6 +382,12 @@ def open_in_app_keyboard(img_path):
     name_entry = Entry(text_frame, width=35)
     name_entry.pack(pady=2)
 
+    # Pre-fill the name with the cached prediction, if this image was classified before
+    prediction = get_cache().lookup(img_path)
+    latitude, longitude = capture_location(img_path)
+    if prediction:
+        name_entry.insert(0, prediction['class'])
+
     # Single-line Entry for the Scientific Name
     scientific_name_label = Label(text_frame, text="Scientific Name:")
     scientific_name_label.pack()
@@ -605,178 +511,368 @@ def open_in_app_keyboard(img_path):
                                img_path,
                                name_entry.get().strip(),
                                desc_entry.get("1.0", "end-1c").strip(),
-                               latitude=50.0,
-                               longitude=50.0,
+                               latitude=latitude,
+                               longitude=longitude,
                                family=family_entry.get().strip(),
                                scientific_name=scientific_name_entry.get().strip()
                            ))
     submit_button.grid(row=3, column=0, columnspan=2, pady=2)
 
+    return page
+
 
 def uploadToStorage(selected_image):
     open_in_app_keyboard(selected_image)
 
+# Function to queue an upload. It is sent by the upload queue's background worker, which
+# retries until it goes through, so this returns at once and works offline.
 def upload_to_firebase(image_path, name, description, latitude, longitude, family, scientific_name):
-    print("Uploading")
-
-    # Upload image to Firebase Storage
-    image_file_name = os.path.basename(image_path)
+    job_id = upload_queue.enqueue(image_path=os.path.abspath(image_path), name=name, description=description,
+                                  latitude=latitude, longitude=longitude, family=family,
+                                  scientific_name=scientific_name)
+    print(f"Upload {job_id} queued")
+
+
+# Function to check that `value` can be a Firestore document id, before the job joins a
+# write batch. Raises ValueError, which fails the upload for good.
+def check_document_id(value, what):
+    if not value:
+        raise ValueError(f"The {what} is empty")
+    if '/' in value or value in ('.', '..') or (value.startswith('__') and value.endswith('__')):
+        raise ValueError(f"The {what} {value!r} cannot be used as a Firestore document id")
+    if len(value.encode('utf-8')) > 1500:
+        raise ValueError(f"The {what} is too long")
+
+
+# Function to send one queued upload's image, on an upload worker. Returns the bytes sent.
+def send_upload(job):
+    image_path = job.fields['image_path']
+    name = job.fields['name']
+    check_document_id(name, "plant name")
+    check_document_id(os.path.basename(image_path), "image file name")
+    print(f"Uploading {image_path}")
+
+    # Downsize and re-encode first; the converted files are kept until the upload is
+    # committed, so a retry resumes with exactly the same bytes
+    prepared = transcode_for_upload(image_path, transcode_key(job))
+    upload_path = prepared['path']
+    job.original_bytes = prepared['original_bytes']
+    job.upload_bytes = prepared['bytes']
+
+    # Upload image to Firebase Storage, resuming a partial upload from an earlier attempt
     folder_name = name  # Folder name in Storage
-    blob = bucket.blob(f'images/{folder_name}/{image_file_name}')
-    blob.upload_from_filename(image_path)
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    extension = os.path.splitext(upload_path)[1]
+    blob = bucket.blob(f'images/{folder_name}/{stem}{extension}')
+    sent = upload_resumable(blob, upload_path, job, content_type=mimetypes.guess_type(upload_path)[0])
 
     # Get the URL of the uploaded image
-    image_url = blob.public_url
+    job.image_url = blob.public_url
+
+    # The thumbnail is small enough to send in one request
+    job.thumbnail_url = None
+    if prepared['thumbnail_path']:
+        thumbnail_extension = os.path.splitext(prepared['thumbnail_path'])[1]
+        thumbnail_blob = bucket.blob(f'thumbnails/{folder_name}/{stem}{thumbnail_extension}')
+        thumbnail_blob.upload_from_filename(prepared['thumbnail_path'],
+                                            content_type=mimetypes.guess_type(prepared['thumbnail_path'])[0])
+        job.thumbnail_url = thumbnail_blob.public_url
+        sent += os.path.getsize(prepared['thumbnail_path'])
+
+    print(f"Sent {job.upload_bytes / 1e3:.0f} KB instead of {job.original_bytes / 1e3:.0f} KB "
+          f"for {os.path.basename(image_path)}")
+    return sent
+
+
+# Function to name the converted files of an upload job
+def transcode_key(job):
+    return f"upload_{job.id}"
+
+
+# Function to write the Firestore documents for uploads whose images have been sent, in
+# one write batch. Every write is safe to repeat, so a failed batch is simply retried.
+# Fields left as None (e.g. by bulk uploads) keep what the plant document already has.
+def commit_uploads(jobs):
+    batch = db.batch()
+    for job in jobs:
+        image_path = job.fields['image_path']
+        name = job.fields['name']
+        image_file_name = os.path.basename(image_path)
+
+        # Prepare data for Firestore
+        plant_details = {
+            'Common Name': name,
+            'Description': job.fields.get('description'),
+            'Family': job.fields.get('family'),
+            'Scientific Name': job.fields.get('scientific_name'),
+        }
+        plant_details = {key: value for key, value in plant_details.items() if value is not None}
+        plant_details[UPDATED_FIELD] = firestore.SERVER_TIMESTAMP  # Lets marker syncs fetch only what changed
+
+        coordinates = {
+            'location': firestore.GeoPoint(job.fields['latitude'], job.fields['longitude']),
+            UPDATED_FIELD: firestore.SERVER_TIMESTAMP
+        }
+
+        # Plant details, image URL and coordinates
+        plant_ref = db.collection('plant_details').document(name)
+        batch.set(plant_ref, plant_details, merge=True)
+        image_details = {'url': job.image_url, 'bytes': job.upload_bytes, 'original_bytes': job.original_bytes}
+        if job.thumbnail_url:
+            image_details['thumbnail_url'] = job.thumbnail_url
+        batch.set(plant_ref.collection('images').document(image_file_name), image_details)
+        batch.set(plant_ref.collection('coordinates').document('location'), coordinates)
+    batch.commit()
+
+    for job in jobs:
+        image_path = job.fields['image_path']
+        if is_indexed_capture(image_path):
+            capture_index.record_upload(os.path.basename(image_path), job.original_bytes, job.upload_bytes)
+        remove_transcoded(transcode_key(job))
+    print(f"Saved details for {len(jobs)} uploads")
+
+
+# Function to queue many captures at once, named after their predicted class. Their files
+# are sent concurrently and their details written in batches by the upload queue.
+# Returns the number queued; captures without a prediction are classified first.
+def bulk_upload(image_paths):
+    image_paths = list(image_paths)
+    captures = [capture_index.get(os.path.basename(image_path)) if is_indexed_capture(image_path) else None
+                for image_path in image_paths]
+    names = [capture['predicted_class'] if capture else None for capture in captures]
+
+    # Classify everything still missing a prediction in one batched call
+    misses = [i for i, name in enumerate(names) if not name]
+    if misses:
+        results = classify_cached([image_paths[i] for i in misses])
+        for i, result in zip(misses, results):
+            names[i] = result['class']
+            if is_indexed_capture(image_paths[i]):
+                capture_index.record_prediction(os.path.basename(image_paths[i]), result)
+
+    jobs = []
+    for image_path, capture, name in zip(image_paths, captures, names):
+        latitude, longitude = capture_location(image_path, capture)
+        jobs.append(dict(image_path=os.path.abspath(image_path), name=name, description=None,
+                         latitude=latitude, longitude=longitude, family=None, scientific_name=None))
+    upload_queue.enqueue_many(jobs)
+    print(f"{len(jobs)} uploads queued")
+    return len(jobs)
+
+
+# Uploads survive restarts and lost connections; the worker drains them in the background
+upload_queue = UploadQueue(send_upload, commit_uploads)
+upload_events = queue.Queue()  # (job id, state, sent, total) from the worker, shown by check_queue
+upload_queue.subscribe(lambda *event: (upload_events.put(event), notify_ui()))
+
+
+# Function to show upload progress in the side bar
+def show_upload_status(job_id, state, sent, total):
+    counts = upload_queue.counts()
+    waiting = counts.get('queued', 0) + counts.get('uploading', 0)
+    if state == 'uploading' and total:
+        text = f"Uploading {100 * sent // total}%\n{waiting} queued"
+    elif waiting:
+        text = f"{waiting} uploads queued"
+    elif upload_queue.last_batch and upload_queue.last_batch['jobs']:
+        # Throughput of the last batch once the queue has drained
+        batch = upload_queue.last_batch
+        text = (f"Sent {batch['jobs']} in {batch['seconds']:.0f}s\n"
+                f"{batch['bytes'] / 1e6 / max(batch['seconds'], 1e-6):.2f} MB/s")
+    else:
+        text = ""
+    if counts.get('failed'):
+        text += f"\n{counts['failed']} failed"
+    if state == 'done':
+        original_bytes, upload_bytes = capture_index.upload_savings()
+        if original_bytes > upload_bytes:
+            text += f"\nSaved {(original_bytes - upload_bytes) / 1e6:.1f} MB"
+    upload_status_label.config(text=text.strip())
+
+    # Offer to skip the backoff while uploads wait for their next attempt, e.g. once the network is back
+    if counts.get('queued') and state != 'uploading':
+        retry_button.pack(side='bottom', fill='x', padx=10, before=upload_status_label)
+    else:
+        retry_button.pack_forget()
+
+# Function to get the directory captured images are saved to
+def get_images_dir():
+    if platform.system() == "Windows":
+        return 'C:/raspberry_images'  # Update this path as needed
+    else:  # Assuming it's a Raspberry Pi or Linux-based system
+        return '/home/mehant/Pictures'  # Update this path as needed
+
+
+# Function to check whether a file in the images directory is a capture
+def is_capture_file(name):
+    return name.startswith('captured_frame_') and name.endswith(tuple(CAPTURE_EXTENSIONS.values()))
+
+
+# Function to check whether a path is a capture tracked by the capture index
+def is_indexed_capture(image_path):
+    return (is_capture_file(os.path.basename(image_path)) and
+            os.path.dirname(os.path.abspath(image_path)) == os.path.abspath(get_images_dir()))
 
-    # Prepare data for Firestore
-    plant_details = {
-        'Common Name': name,
-        'Description': description,
-        'Family': family,
-        'Scientific Name': scientific_name
-    }
 
-    coordinates = {
-        'location': firestore.GeoPoint(latitude, longitude)
-    }
+# Function to get where an image was taken: the GPS fix stored with the capture, or the
+# default location when it has none. `capture` is its index row, if already looked up.
+def capture_location(image_path, capture=None):
+    if capture is None and is_indexed_capture(image_path):
+        capture = capture_index.get(os.path.basename(image_path))
+    if capture and capture['latitude'] is not None and capture['longitude'] is not None:
+        return capture['latitude'], capture['longitude']
+    return DEFAULT_LATITUDE, DEFAULT_LONGITUDE
 
-    # Upload plant details to Firestore
-    plant_ref = db.collection('plant_details').document(name)
-    plant_ref.set(plant_details)
 
-    # Upload image URL to Firestore
-    images_ref = plant_ref.collection('images').document(image_file_name)
-    images_ref.set({
-        'url': image_url
-    })
+# In-memory listing of the captures, kept up to date from filesystem change notifications
+images_watcher = DirectoryWatcher(get_images_dir(), is_capture_file)
 
-    # Upload coordinates to Firestore
-    coordinates_ref = plant_ref.collection('coordinates').document('location')
-    coordinates_ref.set(coordinates)
+# Metadata (prediction, location, upload state, ...) for every capture
+capture_index = CaptureIndex(get_images_dir())
 
-    print("Upload complete")
 
 # Function to delete the selected image
 def delete_selected_image():
     global selected_image
 
     if selected_image is not None:
-        image_path = selected_image
+        image_path = os.path.join(get_images_dir(), selected_image)
         try:
             os.remove(image_path)  # Delete the image file
+            remove_thumbnail(image_path)
             print(f"Deleted image: {image_path}")
+            images_watcher.file_removed(os.path.basename(image_path))  # Drops just this tile from the gallery
             selected_image = None  # Reset selected image
-            show_gallery()  # Refresh the gallery to reflect the changes
         except Exception as e:
             print(f"Error deleting image {selected_image}: {e}")
     else:
         print("No image selected for deletion.")
 
-def show_gallery():
-    if platform.system() == "Windows":
-        images_dir = 'C:/raspberry_images'  # Update this path as needed
-    else:  # Assuming it's a Raspberry Pi or Linux-based system
-        images_dir = '/home/mehant/Pictures'  # Update this path as needed
+# Function to build the gallery page. The grid follows the images directory while hidden,
+# so the page stays alive between visits.
+def build_gallery_page(parent):
+    images_dir = get_images_dir()
+
+    gallery_container = Frame(parent)
 
-    # Verify directory existence
+    # Verify directory existence; the empty page is rebuilt on the next visit, by when a
+    # capture may have created the directory
     if not os.path.exists(images_dir):
         print(f"Error: Directory {images_dir} does not exist.")
-        return
-
-    # List all files in the directory
-    image_files = [f for f in os.listdir(images_dir) if f.startswith('captured_frame_') and f.endswith('.png')]
-
-    # Debugging: Print found image files
-    print(f"Image files found: {image_files}")
-
-    # Create a scrollable gallery
-    gallery_container = Frame(main_frame)
-    gallery_container.pack(fill='both', expand=True)
-
-    canvas = Canvas(gallery_container)
-    canvas.pack(side=LEFT, fill='both', expand=True)
-
-    scrollbar = Scrollbar(gallery_container, orient=VERTICAL, command=canvas.yview)
-    scrollbar.pack(side=RIGHT, fill=Y)
+        gallery_container.placeholder = True
+        return gallery_container
 
-    gallery_frame = Frame(canvas)
-    canvas.create_window((0, 0), window=gallery_frame, anchor='nw')
-    canvas.config(yscrollcommand=scrollbar.set)
-
-    # Configure the scroll region
-    def configure_scroll_region(event):
-        canvas.config(scrollregion=canvas.bbox("all"))
-
-    gallery_frame.bind("<Configure>", configure_scroll_region)
+    # Debugging: Print how many image files are known
+    print(f"Image files found: {len(images_watcher.files())}")
 
     global topPanelGallery
     global selection_label
     selection_label = Label()
 
-    topPanelGallery = Frame(gallery_frame)
-    topPanelGallery.grid(row=0, column=0, columnspan=3, pady=10)
+    topPanelGallery = Frame(gallery_container)
+    topPanelGallery.pack(side=TOP, fill='x', pady=10)
 
     title = Label(topPanelGallery, text='Gallery', compound="left", pady=2, justify="left", highlightthickness=4)
     title.pack(side=LEFT)
 
-    row = 1
-    col = 0
-    max_cols = 4  # Number of columns in the grid
-    thumbnail_size = (150, 150)  # Size of thumbnail images
+    # Filter the gallery through the capture index
+    def apply_filter(choice):
+        if choice == "All":
+            gallery.set_images(images_watcher.files())
+        elif choice == "Not uploaded":
+            gallery.set_images(sorted(capture_index.query(uploaded=False)),
+                               accepts=lambda f: capture_index.matches(f, uploaded=False))
+        else:
+            gallery.set_images(sorted(capture_index.query(predicted_class=choice)),
+                               accepts=lambda f: capture_index.matches(f, predicted_class=choice))
+
+    filter_choice = StringVar(value="All")
+    filter_menu = OptionMenu(topPanelGallery, filter_choice, "All", "Not uploaded", *capture_index.classes(),
+                             command=apply_filter)
+    filter_menu.pack(side=LEFT, padx=10)
+
+    # Offer the classes predicted since the menu was last filled
+    def refresh_filter_menu():
+        menu = filter_menu['menu']
+        menu.delete(0, END)
+        for choice in ["All", "Not uploaded", *capture_index.classes()]:
+            menu.add_command(label=choice, command=lambda c=choice: (filter_choice.set(c), apply_filter(c)))
 
     global selected_image
-    selected_image = None  # Dictionary to track selected images
+    selected_image = None  # File name of the selected image
+    selected_images = set()  # File names picked in multi-select mode
 
     def label_action():
         global topPanelGallery
         global selection_label
         global selected_image
-        if selected_image != None:
-            selection_label.destroy()
+        selection_label.destroy()
+        if multi_select.get() and selected_images:
+            selection_label = Label(topPanelGallery, text=f"Upload {len(selected_images)}", foreground="blue")
+            selection_label.pack(side=RIGHT, expand=True, fill='both')
+            selection_label.bind("<Button-1>", lambda e: start_bulk_upload())
+        elif selected_image != None:
             selection_label = Label(topPanelGallery, text="Upload", foreground="blue")
             selection_label.pack(side=RIGHT, expand=True, fill='both')
-            if platform.system() == "Windows":
-                path = "C:/raspberry_images/"
-            else:
-                path = "/home/mehant/Pictures/"
+            path = images_dir + "/"
             selection_label.bind("<Button-1>", lambda e: uploadToStorage(path + selected_image))
-        else:
-            selection_label.destroy()
+
+    # Queue every picked image; naming them may need the classifier, so it runs off the Tk thread
+    def start_bulk_upload():
+        image_paths = [os.path.join(images_dir, f) for f in sorted(selected_images)]
+        threading.Thread(target=bulk_upload, args=(image_paths,), daemon=True).start()
+        selected_images.clear()
+        gallery.set_selection(selected_images)
+        label_action()
 
     def toggle_selection(image_label, image_file):
         global selected_image
+        if multi_select.get():
+            selected_images.symmetric_difference_update([image_file])
+            gallery.set_selection(selected_images)
+            label_action()
+            return
+
         if selected_image == image_file:
-            image_label.config(highlightthickness=0)
             selected_image = None
-            label_action()
         else:
-            for widget in gallery_frame.winfo_children():
-                if isinstance(widget, Label):
-                    widget.config(highlightthickness=0)
             selected_image = image_file
-            label_action()
-            image_label.config(highlightbackground="blue", highlightthickness=2)
             print(f"Selected image: {selected_image}")
+        # Tiles are recycled while scrolling, so the grid owns the highlight
+        gallery.set_selected(selected_image)
+        label_action()
 
-    for image_file in image_files:
-        image_path = os.path.join(images_dir, image_file)
-        try:
-            print(f"Loading image from: {image_path}")  # Debugging line
-            image = Image.open(image_path)
-            image.thumbnail(thumbnail_size)
-            tk_image = ImageTk.PhotoImage(image)
-
-            image_label = Label(gallery_frame, image=tk_image)
-            image_label.image = tk_image  # Keep a reference to avoid garbage collection
-            image_label.grid(row=row, column=col, padx=5, pady=5)
-            image_label.bind("<Button-1>", lambda e, label=image_label, file=image_file: toggle_selection(label, file))
-
-            col += 1
-            if col >= max_cols:
-                col = 0
-                row += 1
-        except Exception as e:
-            print(f"Error loading image {image_file}: {e}")
+    # Switching between single and multi-select starts a fresh selection
+    def toggle_multi_select():
+        global selected_image
+        selected_image = None
+        selected_images.clear()
+        gallery.set_selection(selected_images)
+        label_action()
+
+    multi_select = BooleanVar(value=False)
+    select_button = Checkbutton(topPanelGallery, text="Select", variable=multi_select, indicatoron=False,
+                                command=toggle_multi_select)
+    select_button.pack(side=LEFT, padx=10)
+
+    # Forget the selection when the selected file disappears from the directory
+    def image_removed(image_file):
+        global selected_image
+        if selected_image == image_file or image_file in selected_images:
+            selected_images.discard(image_file)
+            if selected_image == image_file:
+                selected_image = None
+            label_action()
+
+    # Only the visible rows get widgets, so this stays fast with thousands of captures.
+    # The watcher adds and removes single tiles as captures are saved or deleted.
+    gallery = VirtualGallery(gallery_container, images_dir, on_click=toggle_selection, columns=4,
+                             watcher=images_watcher, on_removed=image_removed)
+    gallery.pack(fill='both', expand=True)
+
+    gallery_container.on_show = refresh_filter_menu
+    gallery_container.memory_estimate = gallery.memory_estimate
+    return gallery_container
 
 
 # Function to handle page navigation and update the main frame content
@@ -785,9 +881,6 @@ def navigate(page):
 
     gallery_selected = camera_selected = map_selected = False
 
-    for widget in main_frame.winfo_children():
-        widget.destroy()
-
     if page == 'gallery':
         gallery_selected = True
     elif page == 'camera':
@@ -795,106 +888,198 @@ def navigate(page):
     elif page == 'map':
         map_selected = True
 
-    gallery_icon = createIcon("assets/gallery", gallery_selected)
-    camera_icon = createIcon("assets/camera", camera_selected)
-    marker_icon = createIcon("assets/marker", map_selected)
+    home_button.config(image=icons[("gallery", gallery_selected)])
+    settings_button.config(image=icons[("camera", camera_selected)])
+    info_button.config(image=icons[("marker", map_selected)])
 
-    home_button.config(image=gallery_icon)
-    settings_button.config(image=camera_icon)
-    info_button.config(image=marker_icon)
+    # Pages stay alive between visits; only the first visit builds one
+    pages.show(page)
 
-    home_button.image = gallery_icon
-    settings_button.image = camera_icon
-    info_button.image = marker_icon
 
-    if page == 'gallery':
-        show_gallery()
-    elif page == 'camera':
-        show_camera()
-    elif page == 'map':
-        show_map()
-
-
-def show_camera():
-    # Detect the operating system
-    system = platform.system()
-
-    # Initialize camera capture based on OS
-    if system == 'Windows':
-        cap = cv2.VideoCapture(0, cv2.CAP_DSHOW)
-    elif system == 'Linux':  # This includes Raspberry Pi
-        cap = cv2.VideoCapture(0)  # Try index 0
-        if not cap.isOpened():
-            cap = cv2.VideoCapture(1)  # Try index 1 if 0 doesn't work
-            if not cap.isOpened():
-                cap = cv2.VideoCapture(-1)  # Try index 1 if 0 doesn't work
-    else:
-        print(f"Unsupported OS: {system}")
-        return
+# Function to build the camera page. The page is kept while hidden, but only uses the
+# camera while shown: hiding it stops the preview and hands the device back to the manager.
+def build_camera_page(parent):
+    # Frames are read on a background thread; the Tk loop only draws the newest one.
+    # The device stays open between visits, so coming back to this page is instant.
+    stream = None
+
+    live_classifier = LiveClassifier()
+
+    preview_photo = None  # Reused for every frame via paste()
+    last_sequence = 0
+    frames_shown = 0
+    stats_started = time.monotonic()
+    update_id = None
+    saved_files = queue.Queue()  # Captures the writer has finished, reported on the Tk thread
 
     def update_frame():
-        # Read frame from the camera
-        ret, frame = cap.read()
-        if ret:
-            cv2image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        nonlocal preview_photo, last_sequence, frames_shown, stats_started, update_id
+        frame, sequence = stream.read()
+        if frame is not None and sequence != last_sequence:
+            last_sequence = sequence
+            if live_classifier.is_running():
+                live_classifier.submit(frame)
+            cv2image = cv2.cvtColor(fit_preview(frame), cv2.COLOR_BGR2RGB)
+            result = live_classifier.latest_result
+            if live_classifier.is_running() and result is not None:
+                draw_prediction(cv2image, result)
             img = Image.fromarray(cv2image)
-            imgtk = ImageTk.PhotoImage(image=img)
-            camera_label.imgtk = imgtk
-            camera_label.config(image=imgtk)
-        camera_label.after(10, update_frame)  # Refresh frame every 10ms
+            if preview_photo is None or (preview_photo.width(), preview_photo.height()) != img.size:
+                preview_photo = ImageTk.PhotoImage(image=img)
+                camera_label.imgtk = preview_photo
+                camera_label.config(image=preview_photo)
+            else:
+                preview_photo.paste(img)
+            frames_shown += 1
+
+        # Refresh the measured frame rates once a second
+        elapsed = time.monotonic() - stats_started
+        if elapsed >= 1.0:
+            stats_label.config(text=f"Camera {stream.fps:.0f} fps | Display {frames_shown / elapsed:.0f} fps | "
+                                    f"Dropped {stream.frames_dropped}")
+            frames_shown = 0
+            stats_started = time.monotonic()
+
+        # Report captures written since the last frame
+        while not saved_files.empty():
+            file_name = saved_files.get_nowait()
+            pending = capture_writer.pending
+            save_label.config(text=f"Saved {file_name}" + (f" ({pending} saving)" if pending else ""))
+
+        update_id = camera_label.after(DISPLAY_INTERVAL_MS, update_frame)
 
     def capture_image():
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        if stream is None:
+            print("Error: Camera not available.")
+            return
+
+        # Milliseconds keep back-to-back captures from overwriting each other
+        now = datetime.now()
+        timestamp = now.strftime("%Y%m%d_%H%M%S_") + f"{now.microsecond // 1000:03d}"
 
         # Directory to save captured images
-        if platform.system() == "Windows":
-            save_dir = 'C:/raspberry_images'  # Update this path as needed
-        else:  # Assuming it's a Raspberry Pi or Linux-based system
-            save_dir = '/home/mehant/Pictures'  # Update this path as needed
+        save_dir = get_images_dir()
 
         # Create the directory if it does not exist
         if not os.path.exists(save_dir):
             os.makedirs(save_dir)
 
+        # Where the capture is taken, from the GPS fix kept by the reader thread
+        latitude, longitude = gps_reader.current_fix()
+
         # File path to save the captured image
-        image_filename = os.path.join(save_dir, f'captured_frame_{timestamp}.png')
+        image_filename = os.path.join(save_dir, f'captured_frame_{timestamp}{capture_writer.extension}')
 
         try:
-            # Read a frame from the camera
-            ret, frame = cap.read()
-            if ret:
-                # Save the captured frame as an image file
-                cv2.imwrite(image_filename, frame)
-                print(f"Image captured and saved as {image_filename}")
-
-                # Update the UI with the captured image
-                if os.path.exists(image_filename):
-                    image = Image.open(image_filename)
-                    tk_image = ImageTk.PhotoImage(image)
-                    camera_label.config(image=tk_image)
-                    camera_label.image = tk_image
-
-                    # Show the captured image in a popup
-                    classify_image(image_filename)
-                else:
-                    print("Error: Captured image not found.")
+            # Take the sharpest of the last few full-resolution frames in burst mode,
+            # otherwise the newest one; only that frame is classified and saved
+            frame = stream.sharpest() if burst_enabled.get() else stream.snapshot()
+            if frame is not None:
+                image = Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+
+                # Show the captured image in a popup, straight from memory
+                result = classify_image(frame, display_image=image)
+
+                # Save the captured frame in the background; once it is written the frame's
+                # prediction goes into the capture index. It is not put in the prediction
+                # cache: the saved file is a lossy (and maybe downscaled) encoding of the
+                # frame, and that cache must describe each file's own content.
+                def saved(path, size):
+                    file_name = os.path.basename(path)
+                    try:
+                        content_hash = hash_file(path)
+                    except OSError as e:
+                        print(f"Error hashing {file_name}: {e}")
+                        content_hash = None
+                    capture_index.record_capture(file_name, size[0], size[1], content_hash, latitude, longitude)
+                    capture_index.record_prediction(file_name, result)
+                    images_watcher.file_added(file_name)
+                    saved_files.put(file_name)
+
+                capture_writer.save(frame, image_filename, on_saved=saved)
+                save_label.config(text=f"Saving {os.path.basename(image_filename)}...")
+                print(f"Image captured, saving as {image_filename}")
             else:
                 print("Error: Failed to capture image.")
         except Exception as e:
             print(f"Error capturing image: {e}")
-        finally:
-            cap.release()  # Release the camera resource
 
-    overlay_frame = Frame(main_frame)
-    overlay_frame.pack(fill='both', expand=True)
+    overlay_frame = Frame(parent)
 
-    camera_label = Label(overlay_frame)
+    camera_label = Label(overlay_frame, font=("Arial", 14))
     camera_label.pack(fill='both', expand=True)
 
+    stats_label = Label(overlay_frame, text="", font=("Arial", 8))
+    stats_label.place(x=5, y=5)
+
+    save_label = Label(overlay_frame, text="", font=("Arial", 8))
+    save_label.place(x=5, y=25)
+
     capture_button = Button(overlay_frame, text="Capture Image", command=capture_image)
     capture_button.place(relx=0.5, rely=0.9, anchor='center', width=150, height=50)
 
-    update_frame()
+    # Toggle continuous classification of the preview
+    def toggle_live():
+        if live_classifier.is_running():
+            live_classifier.stop()
+            live_button.config(text="Live: Off")
+        else:
+            live_classifier.start()
+            live_button.config(text="Live: On")
+
+    live_button = Button(overlay_frame, text="Live: Off", command=toggle_live)
+    live_button.place(relx=0.85, rely=0.9, anchor='center', width=100, height=50)
+
+    # Burst mode picks the steadiest recent frame instead of whichever came last
+    burst_enabled = BooleanVar(value=True)
+    burst_button = Checkbutton(overlay_frame, text="Burst", variable=burst_enabled, indicatoron=False)
+    burst_button.place(relx=0.15, rely=0.9, anchor='center', width=100, height=50)
+
+    # Start the preview when the page is shown
+    def resume():
+        nonlocal stream, last_sequence
+        if stream is not None:
+            return
+        stream = camera_manager.acquire()
+        if stream is None:
+            camera_label.config(image='', text="Camera not available")
+            return
+        camera_label.config(text="")
+        last_sequence = 0
+        update_frame()
+
+    # Stop the preview and the worker when the page is hidden or torn down; the manager
+    # stops reading frames and closes the device once it has been idle for a while
+    def pause():
+        nonlocal stream, update_id
+        if update_id is not None:
+            camera_label.after_cancel(update_id)
+            update_id = None
+        if live_classifier.is_running():
+            live_classifier.stop()
+            live_button.config(text="Live: Off")
+        if stream is not None:
+            stream = None
+            camera_manager.release()
+
+    # The buttons are already gone by the time the page's <Destroy> fires
+    def close_camera(event):
+        nonlocal stream
+        if event.widget is not overlay_frame:
+            return
+        if update_id is not None:
+            camera_label.after_cancel(update_id)
+        live_classifier.stop()
+        if stream is not None:
+            stream = None
+            camera_manager.release()
+
+    overlay_frame.bind("<Destroy>", close_camera)
+    overlay_frame.on_show = resume
+    overlay_frame.on_hide = pause
+
+    resume()
+    return overlay_frame
 
 
 # Create main window
@@ -909,9 +1094,17 @@ side_frame.pack(side='left', fill='y')
 main_frame = Frame(root, relief='sunken')
 main_frame.pack(side='right', expand=True, fill='both')
 
-gallery_icon = createIcon("assets/gallery", gallery_selected)
-camera_icon = createIcon("assets/camera", camera_selected)
-marker_icon = createIcon("assets/marker", map_selected)
+icons = load_icons(["gallery", "camera", "marker"])
+gallery_icon = icons[("gallery", gallery_selected)]
+camera_icon = icons[("camera", camera_selected)]
+marker_icon = icons[("marker", map_selected)]
+
+# Built pages are kept and shown or hidden on navigation
+pages = PageCache(main_frame, {
+    'gallery': build_gallery_page,
+    'camera': build_camera_page,
+    'map': build_map_page,
+})
 
 style = Style()
 style.configure('IconStyle', relief='flat', padding=10, borderwidth=0)
@@ -931,12 +1124,38 @@ info_button = Button(side_frame, image=marker_icon, highlightthickness=0,
                      background='white', activebackground='white')
 info_button.pack(fill='x', expand=True, padx=10, pady=20)
 
+upload_status_label = Label(side_frame, text="", background='white', font=("Arial", 8))
+upload_status_label.pack(side='bottom', fill='x', pady=5)
+
+# Shown by show_upload_status while uploads are waiting to be retried
+retry_button = Button(side_frame, text="Retry now", font=("Arial", 8), command=upload_queue.retry_now)
+
+images_watcher.subscribe(capture_index.on_directory_change)
+images_watcher.start()
+
+# Send anything left queued from earlier sessions
+upload_queue.start()
+show_upload_status(None, 'queued', 0, 0)
+
+# Index captures made while the app was not running, without holding up the UI
+threading.Thread(target=capture_index.sync_files, args=(images_watcher.files(),), daemon=True).start()
+
+# Keep the latest GPS fix for captures
+gps_reader.start()
+
 navigate('gallery')
 
 # Start the data fetch process in the background
 initialize_cache()
 
-# Start checking the queue for updates
-root.after(100, check_queue)
+# Background threads wake the UI through this event instead of it polling
+root.bind('<<QueueUpdated>>', lambda e: check_queue())
+root.after(0, check_queue)  # Anything queued before the main loop started
 
 root.mainloop()
+
+# Finish writing any captures still queued when the window was closed
+for watch in marker_watches:
+    watch.unsubscribe()
+capture_writer.wait()
+camera_manager.close()
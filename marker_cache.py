@@ -0,0 +1,148 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+# On-disk copy of the map markers, so the map can draw before the network answers
+MARKER_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "medplant", "markers.sqlite3")
+
+# Keys per IN (...) clause, below SQLite's limit on query parameters
+_IN_CHUNK = 500
+
+
+# Persistent copy of the plant names and coordinates behind the map markers, with the
+# watermark (latest `updated_at` seen) that the next delta sync starts from.
+# Coordinates are stored per Firestore document path, so a changed document replaces its row.
+class MarkerCache:
+    def __init__(self, path=MARKER_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS plants (
+                plant_id TEXT PRIMARY KEY,
+                name TEXT
+            );
+            CREATE TABLE IF NOT EXISTS coordinates (
+                path TEXT PRIMARY KEY,
+                plant_id TEXT NOT NULL,
+                latitude REAL NOT NULL,
+                longitude REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS coordinates_plant ON coordinates (plant_id);
+            CREATE TABLE IF NOT EXISTS sync_state (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+        self._conn.commit()
+
+    # Markers in the form the map uses: [{"name": ..., "coordinates": [(lat, lon), ...]}]
+    def markers(self):
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT p.plant_id, p.name, c.latitude, c.longitude
+                FROM plants p JOIN coordinates c ON c.plant_id = p.plant_id
+                WHERE p.name IS NOT NULL AND p.name != ''
+                ORDER BY p.plant_id, c.path""").fetchall()
+
+        markers = []
+        last_plant = None
+        for plant_id, name, latitude, longitude in rows:
+            if plant_id != last_plant:
+                markers.append({"name": name, "coordinates": []})
+                last_plant = plant_id
+            markers[-1]["coordinates"].append((latitude, longitude))
+        return markers
+
+    # Ids of the plants stored
+    def plant_ids(self):
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT plant_id FROM plants")}
+
+    # Marker points by coordinates document path: {path: (name, latitude, longitude)}.
+    # With `paths`, only those points (paths without a named plant are left out).
+    def points(self, paths=None):
+        sql = ("SELECT c.path, p.name, c.latitude, c.longitude "
+               "FROM coordinates c JOIN plants p ON p.plant_id = c.plant_id "
+               "WHERE p.name IS NOT NULL AND p.name != ''")
+        with self._lock:
+            if paths is None:
+                rows = self._conn.execute(sql).fetchall()
+            else:
+                rows = []
+                for chunk in _chunks(list(paths)):
+                    rows += self._conn.execute(f"{sql} AND c.path IN ({', '.join('?' * len(chunk))})",
+                                               chunk).fetchall()
+        return {path: (name, latitude, longitude) for path, name, latitude, longitude in rows}
+
+    # Apply changes reported by a realtime listener and return what the map has to redraw:
+    # ({path: (name, latitude, longitude)} to add or move, set of paths to take down).
+    # `plants` is {plant id: name}, `coordinates` a list of (path, plant id, latitude, longitude).
+    def apply_changes(self, plants=None, removed_plants=(), coordinates=(), removed_coordinates=(),
+                      watermark=None):
+        plants = plants or {}
+        with self._lock:
+            # Every point whose plant or document changed, found before anything is deleted
+            affected = {path for path, *_ in coordinates} | set(removed_coordinates)
+            for chunk in _chunks(list(plants) + list(removed_plants)):
+                rows = self._conn.execute(
+                    f"SELECT path FROM coordinates WHERE plant_id IN ({', '.join('?' * len(chunk))})", chunk)
+                affected.update(row[0] for row in rows)
+
+            with self._conn:
+                self._conn.executemany("DELETE FROM plants WHERE plant_id = ?", [(p,) for p in removed_plants])
+                self._conn.executemany("DELETE FROM coordinates WHERE path = ?", [(p,) for p in removed_coordinates])
+                current = self._conn.execute("SELECT value FROM sync_state WHERE key = 'watermark'").fetchone()
+                if watermark is not None and current and current[0]:
+                    watermark = max(watermark, datetime.fromisoformat(current[0]))
+                self._write(plants, coordinates, watermark)
+
+        upserted = self.points(affected)
+        return upserted, affected - set(upserted)
+
+    def _get_state(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+        return datetime.fromisoformat(row[0]) if row and row[0] else None
+
+    # Latest `updated_at` already stored; None before the first sync
+    def watermark(self):
+        return self._get_state('watermark')
+
+    # When the whole catalogue was last fetched
+    def last_full_sync(self):
+        return self._get_state('last_full_sync')
+
+    # Replace everything with a full fetch. `plants` is {plant id: name}, `coordinates`
+    # a list of (document path, plant id, latitude, longitude).
+    def replace(self, plants, coordinates, watermark, synced_at):
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM plants")
+                self._conn.execute("DELETE FROM coordinates")
+                self._write(plants, coordinates, watermark)
+                self._conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES ('last_full_sync', ?)",
+                                   (synced_at.isoformat(),))
+
+    # Merge the documents changed since the last sync
+    def update(self, plants, coordinates, watermark):
+        with self._lock:
+            with self._conn:
+                self._write(plants, coordinates, watermark)
+
+    def _write(self, plants, coordinates, watermark):
+        self._conn.executemany("INSERT OR REPLACE INTO plants (plant_id, name) VALUES (?, ?)", plants.items())
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO coordinates (path, plant_id, latitude, longitude) VALUES (?, ?, ?, ?)",
+            coordinates)
+        if watermark is not None:
+            self._conn.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES ('watermark', ?)",
+                               (watermark.isoformat(),))
+
+
+def _chunks(keys):
+    for start in range(0, len(keys), _IN_CHUNK):
+        yield keys[start:start + _IN_CHUNK]
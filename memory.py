@@ -0,0 +1,10 @@
+import os
+
+
+# Function to read this process's resident memory in bytes (Linux only, None elsewhere)
+def resident_memory():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
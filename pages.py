@@ -0,0 +1,97 @@
+from collections import OrderedDict
+from tkinter import *
+
+# Estimated memory the hidden pages may hold on to before the least recently shown one is destroyed
+PAGE_MEMORY_BUDGET = 150 * 1024 * 1024
+
+# Assumed size of a page that does not estimate its own
+DEFAULT_PAGE_COST = 20 * 1024 * 1024
+
+
+# Keeps built pages alive inside `container` and switches between them by packing and
+# unpacking, so returning to a page does not rebuild it.
+# `builders` maps page names to `build(parent) -> Frame`. A page may define `on_show()` and
+# `on_hide()` to pause work while hidden; destroying the page runs its <Destroy> bindings.
+# Hidden pages are evicted least recently shown first, once more than `max_pages` are alive
+# (shown or hidden; transient pages do not count) or the hidden ones' estimated memory is over
+# the budget. `max_pages` defaults to one per registered builder, so every regular page can
+# stay. A page may define `memory_estimate()` (bytes); otherwise it counts as DEFAULT_PAGE_COST.
+class PageCache:
+    def __init__(self, container, builders=None, max_pages=None, memory_budget=PAGE_MEMORY_BUDGET):
+        self.container = container
+        self.builders = dict(builders or {})
+        self.max_pages = max_pages if max_pages is not None else len(self.builders)
+        self.memory_budget = memory_budget
+        self.current = None
+        self._pages = OrderedDict()  # Page name -> Frame, least recently shown first
+        self._transient = set()  # Pages destroyed as soon as they are hidden
+
+    def get(self, name):
+        return self._pages.get(name)
+
+    # Show page `name`, building it (with `build`, or the registered builder) if it is not alive.
+    # Transient pages, like one-off forms, are destroyed when another page is shown. So is a page
+    # that sets `placeholder = True` when built, e.g. because what it shows is not there yet.
+    def show(self, name, build=None, transient=False):
+        if name == self.current and name in self._pages:
+            return self._pages[name]
+        self._hide_current()
+
+        page = self._pages.get(name)
+        if page is None:
+            page = (build or self.builders[name])(self.container)
+            self._pages[name] = page
+            if transient or getattr(page, 'placeholder', False):
+                self._transient.add(name)
+        else:
+            self._pages.move_to_end(name)
+            if hasattr(page, 'on_show'):
+                page.on_show()
+
+        page.pack(fill='both', expand=True)
+        self.current = name
+        self._evict()
+        return page
+
+    # Destroy page `name` so the next show() builds it afresh
+    def discard(self, name):
+        page = self._pages.pop(name, None)
+        self._transient.discard(name)
+        if name == self.current:
+            self.current = None
+        if page is not None:
+            page.destroy()
+
+    def clear(self):
+        for name in list(self._pages):
+            self.discard(name)
+
+    def _hide_current(self):
+        name = self.current
+        if name is None or name not in self._pages:
+            return
+        self.current = None
+        if name in self._transient:
+            self.discard(name)
+            return
+
+        page = self._pages[name]
+        page.pack_forget()
+        if hasattr(page, 'on_hide'):
+            page.on_hide()
+
+    @staticmethod
+    def _cost(page):
+        if hasattr(page, 'memory_estimate'):
+            return page.memory_estimate()
+        return DEFAULT_PAGE_COST
+
+    def _evict(self):
+        kept = [name for name in self._pages if name not in self._transient]
+        hidden = [name for name in kept if name != self.current]
+        costs = {name: self._cost(self._pages[name]) for name in hidden}
+        while hidden and (len(kept) > self.max_pages or sum(costs.values()) > self.memory_budget):
+            name = hidden.pop(0)
+            kept.remove(name)
+            print(f"Evicting page {name} ({costs.pop(name) / 1e6:.1f} MB estimated)")
+            self.discard(name)
@@ -0,0 +1,213 @@
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+PLANTS_COLLECTION = 'plant_details'
+COORDINATES_COLLECTION = 'coordinates'
+
+# Field stamped with the server time on every plant and coordinates write; delta syncs
+# query it. (Collection-group queries on it need its single-field index enabled for
+# collection-group scope in the Firestore console.)
+UPDATED_FIELD = 'updated_at'
+
+# Parallel subcollection reads when a collection-group query is not available
+FETCH_WORKERS = 8
+
+# Delta syncs cannot see deletions, so the whole catalogue is refetched this often
+FULL_SYNC_INTERVAL = timedelta(days=7)
+
+# Allowance for clock skew when no document carries an `updated_at` yet
+_CLOCK_SKEW = timedelta(minutes=5)
+
+
+# Function to read the common name of every plant (changed after `since`, when given):
+# ({plant id: name}, latest updated_at seen). Only the fields needed are requested.
+def load_plant_names(db, since=None):
+    query = db.collection(PLANTS_COLLECTION)
+    if since is not None:
+        query = query.where(UPDATED_FIELD, '>', since)
+
+    names = {}
+    latest = None
+    for doc in query.select(['Common Name', UPDATED_FIELD]).stream():
+        data = doc.to_dict()
+        names[doc.id] = data.get('Common Name')
+        latest = _later(latest, data.get(UPDATED_FIELD))
+    return names, latest
+
+
+# Function to read every plant's coordinates documents (changed after `since`, when given)
+# with one collection-group query: ([(document path, plant id, latitude, longitude)], latest updated_at)
+def load_coordinate_records(db, since=None):
+    query = db.collection_group(COORDINATES_COLLECTION)
+    if since is not None:
+        query = query.where(UPDATED_FIELD, '>', since)
+
+    records = []
+    latest = None
+    for doc in query.stream():
+        # Skip 'coordinates' collections that do not hang off a plant
+        plant_ref = doc.reference.parent.parent
+        if plant_ref is None or plant_ref.parent.id != PLANTS_COLLECTION:
+            continue
+        data = doc.to_dict()
+        latest = _later(latest, data.get(UPDATED_FIELD))
+        location = data.get('location')
+        if location:
+            records.append((doc.reference.path, plant_ref.id, location.latitude, location.longitude))
+    return records, latest
+
+
+# Function to read the coordinates documents of the given plants one subcollection at a
+# time, `workers` at once. With one worker this is the old one-round-trip-per-plant loader.
+def load_coordinate_records_per_plant(db, plant_ids, workers=FETCH_WORKERS):
+    plants = db.collection(PLANTS_COLLECTION)
+
+    def fetch(plant_id):
+        records = []
+        latest = None
+        for doc in plants.document(plant_id).collection(COORDINATES_COLLECTION).stream():
+            data = doc.to_dict()
+            latest = _later(latest, data.get(UPDATED_FIELD))
+            location = data.get('location')
+            if location:
+                records.append((doc.reference.path, plant_id, location.latitude, location.longitude))
+        return records, latest
+
+    records = []
+    latest = None
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for plant_records, plant_latest in executor.map(fetch, plant_ids):
+            records.extend(plant_records)
+            latest = _later(latest, plant_latest)
+    return records, latest
+
+
+# Function to fetch the whole catalogue: ({plant id: name}, coordinate records, latest updated_at).
+# Two queries in total (plant names, then every coordinate through a collection group).
+# Falls back to bounded parallel per-plant reads if the collection-group query is refused,
+# e.g. by security rules that only allow per-plant reads.
+def fetch_all(db, use_collection_group=True, workers=FETCH_WORKERS):
+    names, latest = load_plant_names(db)
+
+    records = None
+    if use_collection_group:
+        try:
+            records, coordinates_latest = load_coordinate_records(db)
+        except Exception as e:
+            print(f"Collection-group query failed ({e}), reading plants one by one")
+    if records is None:
+        records, coordinates_latest = load_coordinate_records_per_plant(db, list(names), workers)
+    return names, records, _later(latest, coordinates_latest)
+
+
+# Function to join plant names and coordinate records into map markers:
+# [{"name": common name, "coordinates": [(lat, lon), ...]}], in catalogue order
+def build_markers(names, records):
+    coordinates = defaultdict(list)
+    for _, plant_id, latitude, longitude in records:
+        coordinates[plant_id].append((latitude, longitude))
+
+    markers = []
+    for plant_id, common_name in names.items():
+        points = coordinates.get(plant_id)
+        if points and common_name:
+            markers.append({"name": common_name, "coordinates": points})
+    return markers
+
+
+# Function to load the map markers straight from Firestore, without the local cache
+def load_markers(db, use_collection_group=True, workers=FETCH_WORKERS):
+    names, records, _ = fetch_all(db, use_collection_group, workers)
+    return build_markers(names, records)
+
+
+# Function to bring a MarkerCache up to date and return its markers. Only documents
+# changed since the cache's watermark are fetched, except on the first sync and every
+# FULL_SYNC_INTERVAL, when the whole catalogue is refetched to drop deleted plants.
+def sync_markers(db, marker_cache, full_sync_interval=FULL_SYNC_INTERVAL):
+    started = datetime.now(timezone.utc)
+    since = marker_cache.watermark()
+    last_full_sync = marker_cache.last_full_sync()
+
+    if since is not None and last_full_sync is not None and started - last_full_sync < full_sync_interval:
+        try:
+            names, latest = load_plant_names(db, since)
+            records, coordinates_latest = load_coordinate_records(db, since)
+            marker_cache.update(names, records, _later(since, _later(latest, coordinates_latest)))
+            print(f"Marker delta sync: {len(names)} plants, {len(records)} coordinates changed")
+            return marker_cache.markers()
+        except Exception as e:
+            print(f"Marker delta sync failed ({e}), fetching everything")
+
+    names, records, latest = fetch_all(db)
+    marker_cache.replace(names, records, latest or started - _CLOCK_SKEW, started)
+    print(f"Marker full sync: {len(names)} plants, {len(records)} coordinates")
+    return marker_cache.markers()
+
+
+# Function to keep a MarkerCache current with realtime listeners on the plants and on every
+# coordinates collection.
+# Firestore only reports removals of documents a listener matches, so the plants listener
+# takes the whole (small) collection: deleting any plant takes its markers down live, and
+# plants deleted while the app was closed are dropped when the first snapshot arrives.
+# Coordinates are only streamed when changed since the cache's watermark; a coordinates
+# document deleted on its own before that is dropped by the periodic full sync.
+# `on_change(upserted, removed)` gets what the map has to redraw (see MarkerCache.apply_changes),
+# on Firestore's listener thread. Returns the watches; call unsubscribe() on each to stop.
+def watch_markers(db, marker_cache, on_change):
+    since = marker_cache.watermark()
+    first_plants_snapshot = [True]
+
+    def changed(query):
+        return query.where(UPDATED_FIELD, '>', since) if since is not None else query
+
+    def on_plants(docs, changes, read_time):
+        plants = {}
+        removed = []
+        latest = None
+        if first_plants_snapshot[0]:
+            first_plants_snapshot[0] = False
+            removed.extend(marker_cache.plant_ids() - {doc.id for doc in docs})
+        for change in changes:
+            if change.type.name == 'REMOVED':
+                removed.append(change.document.id)
+            else:
+                data = change.document.to_dict()
+                plants[change.document.id] = data.get('Common Name')
+                latest = _later(latest, data.get(UPDATED_FIELD))
+        _apply(plants=plants, removed_plants=removed, watermark=latest)
+
+    def on_coordinates(docs, changes, read_time):
+        records = []
+        removed = []
+        latest = None
+        for change in changes:
+            doc = change.document
+            plant_ref = doc.reference.parent.parent
+            if plant_ref is None or plant_ref.parent.id != PLANTS_COLLECTION:
+                continue
+            data = doc.to_dict() if change.type.name != 'REMOVED' else {}
+            location = data.get('location')
+            if location:
+                records.append((doc.reference.path, plant_ref.id, location.latitude, location.longitude))
+                latest = _later(latest, data.get(UPDATED_FIELD))
+            else:
+                removed.append(doc.reference.path)
+        _apply(coordinates=records, removed_coordinates=removed, watermark=latest)
+
+    def _apply(**changes):
+        upserted, removed = marker_cache.apply_changes(**changes)
+        if upserted or removed:
+            on_change(upserted, removed)
+
+    return [db.collection(PLANTS_COLLECTION).on_snapshot(on_plants),
+            changed(db.collection_group(COORDINATES_COLLECTION)).on_snapshot(on_coordinates)]
+
+
+def _later(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return max(a, b)
@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from PIL import Image
+from inference import classify_batch, current_pool
+from backends import backend_model_path
+
+# On-disk prediction cache
+CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "medplant", "predictions.sqlite3")
+MAX_ENTRIES = 20000
+
+_HASH_CHUNK_SIZE = 1 << 20
+
+
+# Function to hash a file's contents in chunks
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Function to hash an image by content: file bytes for paths, pixel data for in-memory
+# frames and PIL images
+def hash_image(source):
+    if isinstance(source, np.ndarray):
+        digest = hashlib.sha256(str(source.shape).encode())
+        digest.update(np.ascontiguousarray(source).data)
+        return digest.hexdigest()
+    if isinstance(source, Image.Image):
+        digest = hashlib.sha256(f"{source.mode} {source.size}".encode())
+        digest.update(source.tobytes())
+        return digest.hexdigest()
+    return hash_file(source)
+
+
+# Persistent cache of classification results keyed by image content hash and model file hash.
+# Replacing the model file changes its hash, which drops every entry made with the old model.
+# `model_path` defaults to the model of the shared interpreter pool, resolved without loading it.
+class PredictionCache:
+    def __init__(self, path=CACHE_PATH, model_path=None, max_entries=MAX_ENTRIES):
+        self.path = path
+        self._model_path = model_path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._model_stat = None
+        self._model_hash = None
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS predictions (
+                image_hash TEXT NOT NULL,
+                model_hash TEXT NOT NULL,
+                result TEXT NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (image_hash, model_hash)
+            )""")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS predictions_last_used ON predictions (last_used)")
+        self._conn.commit()
+
+    # Model file the cached results belong to: the one given, the shared pool's once it is
+    # loaded, otherwise the configured backend's default model. None when no backend is
+    # available, which makes every lookup a miss.
+    @property
+    def model_path(self):
+        if self._model_path is not None:
+            return self._model_path
+        pool = current_pool()
+        if pool is not None:
+            return pool.model_path
+        return backend_model_path()
+
+    # Hash of the current model file, recomputed only when the file changes on disk.
+    # None when the model file cannot be read, so the cache is bypassed.
+    def model_hash(self):
+        model_path = self.model_path
+        if model_path is None:
+            return None
+        try:
+            stat = os.stat(model_path)
+            model_stat = (stat.st_mtime_ns, stat.st_size)
+            if model_stat == self._model_stat:
+                return self._model_hash
+            model_hash = hash_file(model_path)
+        except OSError as e:
+            print(f"Error reading model {model_path} for the prediction cache: {e}")
+            return None
+
+        self._model_hash = model_hash
+        self._model_stat = model_stat
+        with self._lock:
+            self._conn.execute("DELETE FROM predictions WHERE model_hash != ?", (self._model_hash,))
+            self._conn.commit()
+        return self._model_hash
+
+    # Cached result for an image hash, or None
+    def get(self, image_hash, top_k=1):
+        model_hash = self.model_hash()
+        if model_hash is None:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM predictions WHERE image_hash = ? AND model_hash = ?",
+                (image_hash, model_hash)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE predictions SET last_used = ? WHERE image_hash = ? AND model_hash = ?",
+                (time.time(), image_hash, model_hash))
+            self._conn.commit()
+
+        result = json.loads(row[0])
+        if len(result['top_k']) < top_k:
+            return None
+        result['top_k'] = [tuple(entry) for entry in result['top_k'][:top_k]]
+        return result
+
+    def put(self, image_hash, result):
+        model_hash = self.model_hash()
+        if model_hash is None:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO predictions (image_hash, model_hash, result, last_used) VALUES (?, ?, ?, ?)",
+                (image_hash, model_hash, json.dumps(result), time.time()))
+            self._evict()
+            self._conn.commit()
+
+    # Drop the least recently used entries once the cache grows past max_entries
+    def _evict(self):
+        count = self._conn.execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        self._conn.execute(
+            "DELETE FROM predictions WHERE rowid IN "
+            "(SELECT rowid FROM predictions ORDER BY last_used LIMIT ?)",
+            (count - self.max_entries,))
+
+    # Cached result for an image without running the model, or None
+    def lookup(self, source, top_k=1):
+        try:
+            return self.get(hash_image(source), top_k)
+        except OSError as e:
+            print(f"Error reading prediction cache for {source}: {e}")
+            return None
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+# Function to get the shared prediction cache
+def get_cache():
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = PredictionCache()
+        return _default_cache
+
+
+# Function to classify images, reusing cached results and only running the model on misses.
+# Takes the same arguments as inference.classify_batch and returns results in input order.
+def classify_cached(images, batch_size=8, top_k=3, cache=None):
+    if cache is None:
+        cache = get_cache()
+
+    images = list(images)
+    hashes = [hash_image(source) for source in images]
+    results = [cache.get(image_hash, top_k) for image_hash in hashes]
+
+    misses = [i for i, result in enumerate(results) if result is None]
+    if misses:
+        fresh = classify_batch([images[i] for i in misses], batch_size, top_k)
+        for i, result in zip(misses, fresh):
+            cache.put(hashes[i], result)
+            results[i] = result
+
+    return results
@@ -0,0 +1,75 @@
+import os
+from PIL import Image
+from PIL.PngImagePlugin import PngInfo
+
+# Gallery thumbnail size and where thumbnails are kept, relative to the images directory
+THUMBNAIL_SIZE = (150, 150)
+THUMBNAIL_DIR = ".thumbnails"
+
+# PNG text chunk recording which version of the source a thumbnail was made from
+_SOURCE_KEY = "medplant-source"
+
+
+# Function to get the cached thumbnail file for an image
+def thumbnail_path(image_path):
+    images_dir, image_file = os.path.split(image_path)
+    return os.path.join(images_dir, THUMBNAIL_DIR, image_file + ".png")
+
+
+# Function to build the key that ties a thumbnail to one version of its source file
+def _source_key(stat, size):
+    return f"{stat.st_mtime_ns}:{stat.st_size}:{size[0]}x{size[1]}"
+
+
+# Function to read a cached thumbnail, or None when it is missing or stale
+def _read_cached(path, key):
+    try:
+        with Image.open(path) as cached:
+            if cached.info.get(_SOURCE_KEY) != key:
+                return None
+            cached.load()
+            return cached
+    except (OSError, ValueError):
+        return None
+
+
+# Function to write a thumbnail atomically so a crash never leaves a half-written file
+def _write_cached(path, thumbnail, key):
+    pnginfo = PngInfo()
+    pnginfo.add_text(_SOURCE_KEY, key)
+    temp_path = path + ".tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        thumbnail.save(temp_path, "PNG", pnginfo=pnginfo)
+        os.replace(temp_path, path)
+    except OSError as e:
+        print(f"Error caching thumbnail {path}: {e}")
+
+
+# Function to get the thumbnail for an image, decoding the full image only when the
+# cached thumbnail is missing or the source changed (different mtime or size)
+def load_thumbnail(image_path, size=THUMBNAIL_SIZE):
+    key = _source_key(os.stat(image_path), size)
+    cached_path = thumbnail_path(image_path)
+
+    thumbnail = _read_cached(cached_path, key)
+    if thumbnail is not None:
+        return thumbnail
+
+    with Image.open(image_path) as image:
+        # JPEGs can be decoded straight at 1/2, 1/4 or 1/8 scale; other formats ignore this
+        image.draft("RGB", size)
+        image.thumbnail(size)
+        thumbnail = image.convert("RGB")
+    _write_cached(cached_path, thumbnail, key)
+    return thumbnail
+
+
+# Function to delete the cached thumbnail of an image
+def remove_thumbnail(image_path):
+    try:
+        os.remove(thumbnail_path(image_path))
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"Error removing thumbnail for {image_path}: {e}")
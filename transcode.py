@@ -0,0 +1,83 @@
+import os
+import cv2
+from capture_writer import CAPTURE_EXTENSIONS, encode_params, downscale
+
+# What uploads are converted to before they leave the device; UPLOAD_FORMAT None sends originals
+UPLOAD_FORMAT = 'jpeg'  # 'jpeg' or 'webp' ('png' works too, but saves little)
+UPLOAD_QUALITY = 85
+UPLOAD_MAX_DIMENSION = 1600  # Longest side in pixels, or None to keep the full resolution
+
+# Separate small image for map and gallery clients, or None for no thumbnail
+UPLOAD_THUMBNAIL_SIZE = (320, 320)
+UPLOAD_THUMBNAIL_QUALITY = 75
+
+# Where converted files wait until their upload has gone through
+TRANSCODE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "medplant", "upload_files")
+
+
+# Function to write `frame` to `path` in `image_format`, under a temporary name first
+def _write(frame, path, image_format, quality):
+    temp_path = os.path.join(os.path.dirname(path), ".tmp_" + os.path.basename(path))
+    if not cv2.imwrite(temp_path, frame, encode_params(image_format, quality)):
+        raise OSError(f"Failed to encode {path}")
+    os.replace(temp_path, path)
+
+
+# Function to prepare an image for upload: downsized to `max_dimension` and re-encoded, plus
+# an optional thumbnail. Outputs are named after `key` in `out_dir` and reused if they already
+# exist, so a retried upload sends the very same bytes (which resumable uploads rely on).
+# The original is sent as is when converting would not make it smaller.
+# Returns {'path', 'thumbnail_path', 'original_bytes', 'bytes'}; 'thumbnail_path' may be None.
+def transcode_for_upload(image_path, key, out_dir=TRANSCODE_DIR, image_format=UPLOAD_FORMAT,
+                         quality=UPLOAD_QUALITY, max_dimension=UPLOAD_MAX_DIMENSION,
+                         thumbnail_size=UPLOAD_THUMBNAIL_SIZE, thumbnail_quality=UPLOAD_THUMBNAIL_QUALITY):
+    original_bytes = os.path.getsize(image_path)
+    result = {'path': image_path, 'thumbnail_path': None, 'original_bytes': original_bytes,
+              'bytes': original_bytes}
+    if image_format is None and thumbnail_size is None:
+        return result
+
+    os.makedirs(out_dir, exist_ok=True)
+    extension = CAPTURE_EXTENSIONS[image_format or 'jpeg']
+    path = os.path.join(out_dir, key + extension)
+    thumbnail_path = os.path.join(out_dir, key + "_thumbnail" + extension) if thumbnail_size else None
+    original_marker = os.path.join(out_dir, key + ".original")
+
+    frame = None
+    if image_format is not None and not os.path.exists(path) and not os.path.exists(original_marker):
+        frame = cv2.imread(image_path, cv2.IMREAD_COLOR)
+        if frame is None:
+            raise ValueError(f"Cannot read image {image_path}")
+        max_size = (max_dimension, max_dimension) if max_dimension else None
+        _write(downscale(frame, max_size), path, image_format, quality)
+        if os.path.getsize(path) >= original_bytes:
+            # Already small; remember the decision so retries agree with it
+            os.remove(path)
+            open(original_marker, 'w').close()
+
+    if thumbnail_path is not None and not os.path.exists(thumbnail_path):
+        if frame is None:
+            frame = cv2.imread(image_path, cv2.IMREAD_COLOR)
+            if frame is None:
+                raise ValueError(f"Cannot read image {image_path}")
+        _write(downscale(frame, thumbnail_size), thumbnail_path, image_format or 'jpeg', thumbnail_quality)
+
+    if os.path.exists(path):
+        result['path'] = path
+        result['bytes'] = os.path.getsize(path)
+    result['thumbnail_path'] = thumbnail_path
+    return result
+
+
+# Function to delete the files transcode_for_upload made for `key`, once they are uploaded
+def remove_transcoded(key, out_dir=TRANSCODE_DIR):
+    try:
+        names = os.listdir(out_dir)
+    except OSError:
+        return
+    for name in names:
+        if name.startswith(key + ".") or name.startswith(key + "_thumbnail."):
+            try:
+                os.remove(os.path.join(out_dir, name))
+            except OSError as e:
+                print(f"Error removing {name}: {e}")
@@ -0,0 +1,262 @@
+import os
+import json
+import time
+import random
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+# Uploads waiting to be sent, kept on disk so they survive restarts and lost connections
+UPLOAD_QUEUE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "medplant", "uploads.sqlite3")
+
+# Retry delays: BASE_DELAY doubling per failed attempt, capped at MAX_DELAY, with jitter
+BASE_DELAY = 5.0
+MAX_DELAY = 300.0
+
+# Bytes sent per request of a resumable upload; must be a multiple of 256 KiB
+CHUNK_SIZE = 1024 * 1024
+
+# Jobs taken from the queue together: their files are sent UPLOAD_WORKERS at a time and
+# their metadata committed together (Firestore allows 500 writes per batch)
+BATCH_SIZE = 50
+UPLOAD_WORKERS = 4
+
+# Errors that retrying cannot fix
+PERMANENT_ERRORS = (FileNotFoundError, IsADirectoryError, ValueError)
+
+
+# One queued upload as seen by the function that performs it. `fields` are the values it
+# was queued with; `session_url` is the resumable upload session from an earlier attempt.
+class UploadJob:
+    def __init__(self, queue, job_id, fields, session_url, attempts):
+        self.id = job_id
+        self.fields = fields
+        self.session_url = session_url
+        self.attempts = attempts
+        self._queue = queue
+
+    # Remember the resumable session so a later attempt continues where this one stopped
+    def save_session(self, session_url):
+        self.session_url = session_url
+        self._queue._execute("UPDATE uploads SET session_url = ? WHERE id = ?", (session_url, self.id))
+
+    def report(self, sent, total):
+        self._queue._notify(self.id, 'uploading', sent, total)
+
+
+# Persistent queue of uploads drained by a background worker, up to `batch_size` jobs at a time.
+# `send(job)` transfers one job's file and returns the bytes sent; it runs on `workers` threads
+# at once. `commit(jobs)` then writes the metadata of every job whose file went through, in
+# one go; if that raises, the jobs are committed one at a time so only the ones at fault fail.
+# A failed job is retried with exponential backoff, except for PERMANENT_ERRORS, which mark it failed.
+# Subscribers get `callback(job_id, state, sent, total)` on worker threads, with state
+# 'queued', 'uploading', 'retrying', 'done' or 'failed'. `last_batch` describes the latest
+# batch: {'jobs', 'bytes', 'seconds'}.
+class UploadQueue:
+    def __init__(self, send, commit=None, path=UPLOAD_QUEUE_PATH, batch_size=BATCH_SIZE,
+                 workers=UPLOAD_WORKERS):
+        self.send = send
+        self.commit = commit
+        self.path = path
+        self.batch_size = batch_size
+        self.last_batch = None
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._listeners = []
+        self._thread = None
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS uploads (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fields TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt REAL NOT NULL DEFAULT 0,
+                session_url TEXT,
+                last_error TEXT
+            );
+            CREATE INDEX IF NOT EXISTS uploads_next ON uploads (state, next_attempt);
+        """)
+        # Jobs interrupted by a crash or shutdown go back in line
+        self._conn.execute("UPDATE uploads SET state = 'queued' WHERE state = 'uploading'")
+        self._conn.commit()
+
+    def _execute(self, sql, params=()):
+        with self._lock:
+            cursor = self._conn.execute(sql, params)
+            self._conn.commit()
+            return cursor
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def subscribe(self, callback):
+        self._listeners.append(callback)
+
+    # Queue an upload; `fields` must be JSON-serializable. Returns the job id.
+    def enqueue(self, **fields):
+        return self.enqueue_many([fields])[0]
+
+    # Queue several uploads in one transaction. Returns their job ids.
+    def enqueue_many(self, fields_list):
+        with self._lock:
+            with self._conn:
+                job_ids = [self._conn.execute("INSERT INTO uploads (fields) VALUES (?)",
+                                              (json.dumps(fields),)).lastrowid
+                           for fields in fields_list]
+        for job_id in job_ids:
+            self._notify(job_id, 'queued', 0, 0)
+        self._wake.set()
+        return job_ids
+
+    # Try waiting jobs now instead of at their backoff time, e.g. when the network is back
+    def retry_now(self):
+        self._execute("UPDATE uploads SET next_attempt = 0 WHERE state = 'queued'")
+        self._wake.set()
+
+    # Number of jobs by state, e.g. {'queued': 3, 'failed': 1}
+    def counts(self):
+        with self._lock:
+            return dict(self._conn.execute("SELECT state, COUNT(*) FROM uploads GROUP BY state"))
+
+    def _notify(self, job_id, state, sent, total):
+        for callback in list(self._listeners):
+            try:
+                callback(job_id, state, sent, total)
+            except Exception as e:
+                print(f"Error reporting upload {job_id}: {e}")
+
+    # Jobs that are due, marked as uploading, and the seconds until the next waiting job is
+    # due when none are (None if nothing waits)
+    def _claim(self):
+        now = time.time()
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, fields, session_url, attempts FROM uploads "
+                "WHERE state = 'queued' AND next_attempt <= ? ORDER BY id LIMIT ?",
+                (now, self.batch_size)).fetchall()
+            if not rows:
+                row = self._conn.execute("SELECT MIN(next_attempt) FROM uploads WHERE state = 'queued'").fetchone()
+                return [], (row[0] - now if row[0] is not None else None)
+            self._conn.executemany("UPDATE uploads SET state = 'uploading' WHERE id = ?", [(r[0],) for r in rows])
+            self._conn.commit()
+        return [UploadJob(self, job_id, json.loads(fields), session_url, attempts)
+                for job_id, fields, session_url, attempts in rows], None
+
+    def _run(self):
+        while True:
+            # Cleared before looking, so an enqueue during the look still wakes the wait
+            self._wake.clear()
+            jobs, delay = self._claim()
+            if not jobs:
+                self._wake.wait(delay)
+                continue
+
+            started = time.perf_counter()
+            futures = [(job, self._executor.submit(self.send, job)) for job in jobs]
+            sent = []
+            total_bytes = 0
+            for job, future in futures:
+                try:
+                    total_bytes += future.result() or 0
+                    sent.append(job)
+                except Exception as e:
+                    self._failed(job, e)
+
+            if sent and self.commit is not None:
+                sent = self._commit(sent)
+
+            with self._lock:
+                self._conn.executemany("DELETE FROM uploads WHERE id = ?", [(job.id,) for job in sent])
+                self._conn.commit()
+            for job in sent:
+                self._notify(job.id, 'done', 0, 0)
+
+            elapsed = time.perf_counter() - started
+            self.last_batch = {'jobs': len(sent), 'bytes': total_bytes, 'seconds': elapsed}
+            print(f"Uploaded {len(sent)} of {len(jobs)} files, {total_bytes / 1e6:.1f} MB in {elapsed:.1f}s "
+                  f"({total_bytes / 1e6 / max(elapsed, 1e-6):.2f} MB/s)")
+
+    # Commit `jobs` together, falling back to one at a time when that fails.
+    # Returns the jobs committed; the others are marked failed.
+    def _commit(self, jobs):
+        try:
+            self.commit(jobs)
+            return jobs
+        except Exception as e:
+            if len(jobs) == 1:
+                self._failed(jobs[0], e)
+                return []
+            print(f"Committing {len(jobs)} uploads together failed ({e}), committing them one by one")
+
+        committed = []
+        for job in jobs:
+            try:
+                self.commit([job])
+                committed.append(job)
+            except Exception as e:
+                self._failed(job, e)
+        return committed
+
+    def _failed(self, job, error):
+        if isinstance(error, PERMANENT_ERRORS):
+            print(f"Upload {job.id} failed: {error}")
+            self._execute("UPDATE uploads SET state = 'failed', last_error = ? WHERE id = ?", (str(error), job.id))
+            self._notify(job.id, 'failed', 0, 0)
+            return
+
+        attempts = job.attempts + 1
+        delay = min(BASE_DELAY * 2 ** (attempts - 1), MAX_DELAY) * random.uniform(0.5, 1.0)
+        print(f"Upload {job.id} failed ({error}), retrying in {delay:.0f}s")
+        self._execute("UPDATE uploads SET state = 'queued', attempts = ?, next_attempt = ?, last_error = ? "
+                      "WHERE id = ?", (attempts, time.time() + delay, str(error), job.id))
+        self._notify(job.id, 'retrying', 0, 0)
+
+
+# Function to upload a file to a Cloud Storage blob through a resumable session, in
+# CHUNK_SIZE pieces. The session is kept on `job`, so after a dropped connection (or a
+# restart) the next attempt asks the server how much arrived and sends only the rest.
+# Returns the bytes sent by this call.
+def upload_resumable(blob, path, job, content_type=None):
+    total = os.path.getsize(path)
+    session_url = job.session_url
+    if session_url is None:
+        session_url = blob.create_resumable_upload_session(content_type=content_type, size=total)
+        job.save_session(session_url)
+
+    # Ask how much of the file the session already has
+    response = requests.put(session_url, headers={'Content-Range': f'bytes */{total}'}, timeout=30)
+    if response.status_code in (404, 410):  # Session expired; start over
+        job.save_session(None)
+        return upload_resumable(blob, path, job, content_type)
+    offset = resumed_at = _committed_bytes(response, total)
+
+    with open(path, 'rb') as f:
+        while offset < total:
+            job.report(offset, total)
+            f.seek(offset)
+            chunk = f.read(CHUNK_SIZE)
+            end = offset + len(chunk) - 1
+            response = requests.put(session_url, data=chunk, timeout=60,
+                                    headers={'Content-Range': f'bytes {offset}-{end}/{total}'})
+            offset = _committed_bytes(response, total)
+    job.report(total, total)
+    return total - resumed_at
+
+
+# Bytes the server has stored, from a resumable upload response
+def _committed_bytes(response, total):
+    if response.status_code in (200, 201):
+        return total
+    if response.status_code == 308:
+        committed = response.headers.get('Range')  # e.g. "bytes=0-1048575"
+        return int(committed.split('-')[1]) + 1 if committed else 0
+    response.raise_for_status()
+    raise requests.HTTPError(f"Unexpected upload response {response.status_code}", response=response)